@@ -0,0 +1,27 @@
+"""Add composite index for action-filtered activity log scans
+
+Revision ID: add_activity_log_action_index
+Revises: add_engagement_campaign_indexes
+Create Date: 2026-09-01 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_activity_log_action_index'
+down_revision = 'add_engagement_campaign_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_activity_action_ts',
+        'activity_logs',
+        ['action', 'timestamp']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_activity_action_ts', table_name='activity_logs')
@@ -0,0 +1,31 @@
+"""Promote action_type and error_type out of the activity log JSON
+
+Revision ID: add_activity_log_error_columns
+Revises: add_activity_log_action_index
+Create Date: 2026-09-01 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_activity_log_error_columns'
+down_revision = 'add_activity_log_action_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('activity_logs', sa.Column('action_type', sa.String(), nullable=True))
+    op.add_column('activity_logs', sa.Column('error_type', sa.String(), nullable=True))
+    op.create_index(
+        'ix_activity_action_error_ts',
+        'activity_logs',
+        ['action', 'error_type', 'timestamp']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_activity_action_error_ts', table_name='activity_logs')
+    op.drop_column('activity_logs', 'error_type')
+    op.drop_column('activity_logs', 'action_type')
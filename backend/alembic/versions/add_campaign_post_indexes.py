@@ -0,0 +1,39 @@
+"""Add composite indexes for campaign post monitoring queries
+
+Revision ID: add_campaign_post_indexes
+Revises: add_shortened_urls
+Create Date: 2026-09-01 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_campaign_post_indexes'
+down_revision = 'add_shortened_urls'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_campaignpost_campaign_status_posted',
+        'campaign_posts',
+        ['campaign_id', 'status', 'posted_at']
+    )
+    op.create_index(
+        'ix_campaignpost_account_posted',
+        'campaign_posts',
+        ['account_id', 'posted_at']
+    )
+    op.create_index(
+        'ix_campaignpost_account_status',
+        'campaign_posts',
+        ['account_id', 'status']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_campaignpost_account_status', table_name='campaign_posts')
+    op.drop_index('ix_campaignpost_account_posted', table_name='campaign_posts')
+    op.drop_index('ix_campaignpost_campaign_status_posted', table_name='campaign_posts')
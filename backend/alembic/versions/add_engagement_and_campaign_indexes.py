@@ -0,0 +1,39 @@
+"""Add composite indexes for engagement and campaign range filters
+
+Revision ID: add_engagement_campaign_indexes
+Revises: add_campaign_post_indexes
+Create Date: 2026-09-01 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'add_engagement_campaign_indexes'
+down_revision = 'add_campaign_post_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_engagement_account_ts',
+        'engagement_logs',
+        ['account_id', 'timestamp']
+    )
+    op.create_index(
+        'ix_campaignpost_campaign_posted',
+        'campaign_posts',
+        ['campaign_id', 'posted_at']
+    )
+    op.create_index(
+        'ix_campaignpost_campaign_subreddit_posted',
+        'campaign_posts',
+        ['campaign_id', 'subreddit', 'posted_at']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_campaignpost_campaign_subreddit_posted', table_name='campaign_posts')
+    op.drop_index('ix_campaignpost_campaign_posted', table_name='campaign_posts')
+    op.drop_index('ix_engagement_account_ts', table_name='engagement_logs')
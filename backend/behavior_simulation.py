@@ -4,7 +4,6 @@ Provides sophisticated algorithms to mimic realistic human activity patterns
 """
 import random
 import logging
-import math
 from datetime import datetime, timedelta, time
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
@@ -31,7 +30,53 @@ class UserPersonality(Enum):
     POWER_USER = "power_user"  # High activity, multiple sessions
     LURKER = "lurker"          # Mostly browsing, minimal posting
 
-@dataclass
+# Fixed ordering for activity_distribution tuples (SEARCH has no configured
+# weight and falls back to the 0.1 default in calculate_activity_probability)
+DISTRIBUTION_ORDER = (ActivityType.BROWSE, ActivityType.UPVOTE,
+                      ActivityType.COMMENT, ActivityType.POST)
+_DISTRIBUTION_INDEX = {activity: i for i, activity in enumerate(DISTRIBUTION_ORDER)}
+
+# Base delay ranges in seconds for each activity type
+_BASE_DELAYS = {
+    ActivityType.UPVOTE: (2, 8),      # Quick upvotes
+    ActivityType.COMMENT: (30, 180),  # Time to read and write
+    ActivityType.POST: (120, 600),    # Time to create content
+    ActivityType.BROWSE: (5, 30),     # Browsing between actions
+    ActivityType.SEARCH: (10, 45)     # Searching and reading
+}
+
+def _build_delay_stats() -> Dict[Tuple[ActivityType, Optional[ActivityType]], Tuple[int, int, float, float, int]]:
+    """Precompute (min, max, mean, std_dev, cap) per (action, previous_action) pair"""
+    stats = {}
+    for action_type, (base_min, base_max) in _BASE_DELAYS.items():
+        for previous_action in (None, *_BASE_DELAYS):
+            min_delay, max_delay = base_min, base_max
+
+            # Adjust based on previous action
+            if previous_action == ActivityType.COMMENT and action_type == ActivityType.UPVOTE:
+                # Quick upvote after commenting
+                min_delay = max(1, min_delay // 2)
+                max_delay = max(3, max_delay // 2)
+            elif previous_action == ActivityType.UPVOTE and action_type == ActivityType.COMMENT:
+                # Longer delay when switching from upvoting to commenting
+                min_delay = int(min_delay * 1.5)
+                max_delay = int(max_delay * 1.5)
+
+            mean_delay = (min_delay + max_delay) / 2
+            std_dev = (max_delay - min_delay) / 6  # 99.7% within range
+            stats[(action_type, previous_action)] = (
+                min_delay, max_delay, mean_delay, std_dev, max_delay * 2
+            )
+    return stats
+
+_DELAY_STATS = _build_delay_stats()
+
+# Reusable lookback windows (timedelta construction is not free in hot paths)
+_PERSONALITY_WINDOW = timedelta(days=30)
+_FATIGUE_WINDOW = timedelta(hours=2)
+_SESSION_WINDOW = timedelta(minutes=30)
+
+@dataclass(slots=True, frozen=True)
 class ActivitySession:
     """Represents a realistic activity session"""
     start_time: datetime
@@ -41,14 +86,14 @@ class ActivitySession:
     break_probability: float
     personality_type: UserPersonality
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class BehaviorPattern:
     """Behavior pattern configuration"""
     personality: UserPersonality
     daily_sessions: int
     session_duration_range: Tuple[int, int]  # min, max minutes
     preferred_hours: List[int]
-    activity_distribution: Dict[ActivityType, float]
+    activity_distribution: Tuple[float, float, float, float]  # ordered by DISTRIBUTION_ORDER
     break_frequency: float
     weekend_modifier: float
 
@@ -68,12 +113,7 @@ class HumanBehaviorSimulator:
                 daily_sessions=2,
                 session_duration_range=(5, 20),
                 preferred_hours=[12, 13, 19, 20, 21],
-                activity_distribution={
-                    ActivityType.BROWSE: 0.4,
-                    ActivityType.UPVOTE: 0.35,
-                    ActivityType.COMMENT: 0.2,
-                    ActivityType.POST: 0.05
-                },
+                activity_distribution=(0.4, 0.35, 0.2, 0.05),
                 break_frequency=0.3,
                 weekend_modifier=1.5
             ),
@@ -82,12 +122,7 @@ class HumanBehaviorSimulator:
                 daily_sessions=4,
                 session_duration_range=(10, 45),
                 preferred_hours=[8, 9, 12, 13, 17, 18, 20, 21, 22],
-                activity_distribution={
-                    ActivityType.BROWSE: 0.3,
-                    ActivityType.UPVOTE: 0.4,
-                    ActivityType.COMMENT: 0.25,
-                    ActivityType.POST: 0.05
-                },
+                activity_distribution=(0.3, 0.4, 0.25, 0.05),
                 break_frequency=0.2,
                 weekend_modifier=1.3
             ),
@@ -96,12 +131,7 @@ class HumanBehaviorSimulator:
                 daily_sessions=6,
                 session_duration_range=(20, 90),
                 preferred_hours=[7, 8, 9, 11, 12, 13, 15, 16, 17, 18, 19, 20, 21, 22, 23],
-                activity_distribution={
-                    ActivityType.BROWSE: 0.25,
-                    ActivityType.UPVOTE: 0.35,
-                    ActivityType.COMMENT: 0.3,
-                    ActivityType.POST: 0.1
-                },
+                activity_distribution=(0.25, 0.35, 0.3, 0.1),
                 break_frequency=0.15,
                 weekend_modifier=1.2
             ),
@@ -110,12 +140,7 @@ class HumanBehaviorSimulator:
                 daily_sessions=3,
                 session_duration_range=(15, 60),
                 preferred_hours=[11, 12, 13, 18, 19, 20, 21, 22],
-                activity_distribution={
-                    ActivityType.BROWSE: 0.6,
-                    ActivityType.UPVOTE: 0.3,
-                    ActivityType.COMMENT: 0.08,
-                    ActivityType.POST: 0.02
-                },
+                activity_distribution=(0.6, 0.3, 0.08, 0.02),
                 break_frequency=0.25,
                 weekend_modifier=1.4
             )
@@ -141,37 +166,18 @@ class HumanBehaviorSimulator:
         Returns:
             Delay in seconds
         """
-        base_delays = {
-            ActivityType.UPVOTE: (2, 8),      # Quick upvotes
-            ActivityType.COMMENT: (30, 180),  # Time to read and write
-            ActivityType.POST: (120, 600),    # Time to create content
-            ActivityType.BROWSE: (5, 30),     # Browsing between actions
-            ActivityType.SEARCH: (10, 45)     # Searching and reading
-        }
-        
-        min_delay, max_delay = base_delays.get(action_type, (5, 30))
-        
-        # Adjust based on previous action
-        if previous_action:
-            if previous_action == ActivityType.COMMENT and action_type == ActivityType.UPVOTE:
-                # Quick upvote after commenting
-                min_delay = max(1, min_delay // 2)
-                max_delay = max(3, max_delay // 2)
-            elif previous_action == ActivityType.UPVOTE and action_type == ActivityType.COMMENT:
-                # Longer delay when switching from upvoting to commenting
-                min_delay = int(min_delay * 1.5)
-                max_delay = int(max_delay * 1.5)
-        
+        stats = _DELAY_STATS.get((action_type, previous_action))
+        if stats is None:
+            stats = _DELAY_STATS[(ActivityType.BROWSE, None)]
+        min_delay, _, mean_delay, std_dev, cap = stats
+
         # Add human-like variability using normal distribution
-        mean_delay = (min_delay + max_delay) / 2
-        std_dev = (max_delay - min_delay) / 6  # 99.7% within range
-        
         delay = max(min_delay, int(random.normalvariate(mean_delay, std_dev)))
-        delay = min(delay, max_delay * 2)  # Cap at 2x max for extreme cases
-        
+        delay = min(delay, cap)  # Cap at 2x max for extreme cases
+
         # Add micro-variations (human reaction time)
         micro_variation = random.uniform(0.1, 2.0)
-        
+
         return int(delay + micro_variation)
     
     def calculate_activity_probability(self, account_id: int, action_type: ActivityType, 
@@ -192,11 +198,12 @@ class HumanBehaviorSimulator:
         
         try:
             # Get account personality
-            personality = self._get_account_personality(account_id)
+            personality = self._get_account_personality(account_id, now=current_time)
             pattern = self.behavior_patterns[personality]
             
             # Base probability from activity distribution
-            base_prob = pattern.activity_distribution.get(action_type, 0.1)
+            dist_index = _DISTRIBUTION_INDEX.get(action_type)
+            base_prob = pattern.activity_distribution[dist_index] if dist_index is not None else 0.1
             
             # Time-based modifiers
             hour = current_time.hour
@@ -313,9 +320,11 @@ class HumanBehaviorSimulator:
         
         return min(final_time, max_time)
     
-    def _get_account_personality(self, account_id: int) -> UserPersonality:
+    def _get_account_personality(self, account_id: int, now: Optional[datetime] = None) -> UserPersonality:
         """Get or assign personality type for account"""
         try:
+            if now is None:
+                now = datetime.utcnow()
             db = SessionLocal()
             
             # Check if personality is stored in automation settings
@@ -329,7 +338,7 @@ class HumanBehaviorSimulator:
             # Assign personality based on account activity history
             recent_logs = db.query(EngagementLog).filter(
                 EngagementLog.account_id == account_id,
-                EngagementLog.timestamp >= datetime.utcnow() - timedelta(days=30)
+                EngagementLog.timestamp >= now - _PERSONALITY_WINDOW
             ).count()
             
             db.close()
@@ -354,7 +363,7 @@ class HumanBehaviorSimulator:
             db = SessionLocal()
             
             # Check activity in last 2 hours
-            recent_cutoff = current_time - timedelta(hours=2)
+            recent_cutoff = current_time - _FATIGUE_WINDOW
             recent_activity = db.query(EngagementLog).filter(
                 EngagementLog.account_id == account_id,
                 EngagementLog.timestamp >= recent_cutoff
@@ -382,7 +391,7 @@ class HumanBehaviorSimulator:
             db = SessionLocal()
             
             # Check if we're in an active session (activity in last 30 minutes)
-            session_cutoff = current_time - timedelta(minutes=30)
+            session_cutoff = current_time - _SESSION_WINDOW
             session_activity = db.query(EngagementLog).filter(
                 EngagementLog.account_id == account_id,
                 EngagementLog.timestamp >= session_cutoff
@@ -444,7 +453,7 @@ class HumanBehaviorSimulator:
         activities.append(ActivityType.BROWSE)
         
         # Add other activities based on distribution
-        for activity_type, probability in pattern.activity_distribution.items():
+        for activity_type, probability in zip(DISTRIBUTION_ORDER, pattern.activity_distribution):
             if activity_type != ActivityType.BROWSE and random.random() < probability:
                 activities.append(activity_type)
         
@@ -1,14 +1,39 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init, task_postrun
 from dotenv import load_dotenv
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Prefer orjson for task payloads: it is a C-level codec several times
+# faster than stdlib json for the multi-kB dicts our tasks pass around.
+# Falls back to stdlib json when orjson is not installed.
+if orjson is not None:
+    from kombu import serialization
+
+    serialization.register(
+        'orjson',
+        lambda obj: orjson.dumps(obj, option=orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC),
+        orjson.loads,
+        content_type='application/x-orjson',
+        content_encoding='utf-8',
+    )
+    _task_serializer = 'orjson'
+    _accept_content = ['orjson', 'json']
+else:
+    _task_serializer = 'json'
+    _accept_content = ['json']
+
 # Create Celery app
 celery_app = Celery(
     'reddit_automation',
@@ -19,11 +44,27 @@ celery_app = Celery(
 
 # Configure Celery
 celery_app.conf.update(
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
+    task_serializer=_task_serializer,
+    accept_content=_accept_content,
+    result_serializer=_task_serializer,
     timezone='UTC',
     enable_utc=True,
+    # This is a fire-and-forget workload: almost no caller reads task
+    # results, so skip the Redis SET per task completion. Tasks that do
+    # return consumed values opt back in with ignore_result=False.
+    task_ignore_result=True,
+    result_expires=3600,
+    broker_pool_limit=10,
+    broker_connection_retry_on_startup=True,
+    # Cap Redis connections per worker so a fleet of workers cannot push
+    # the server into "max clients reached"
+    broker_transport_options={
+        'max_connections': 20,
+        'socket_keepalive': True,
+        'health_check_interval': 30,
+        'visibility_timeout': 3600,
+    },
+    redis_max_connections=20,
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
@@ -45,12 +86,24 @@ celery_app.conf.update(
     worker_send_task_events=True,
 )
 
+# Use the Redis-backed redbeat scheduler: the default PersistentScheduler
+# rereads and rewrites the whole schedule file every tick, which degrades
+# as entries grow; redbeat keeps due times in a Redis ZSET and only wakes
+# for entries that are actually due. The beat_schedule dict below seeds it.
+celery_app.conf.beat_scheduler = 'redbeat.RedBeatScheduler'
+celery_app.conf.redbeat_redis_url = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+
 # Configure periodic tasks for automation engine
 celery_app.conf.beat_schedule = {
-    # Core automation scheduling
+    # Core automation scheduling: a blocking watcher reacts to wakeup
+    # signals immediately; the plain poll is only a safety net
+    'watch-automation-wakeups': {
+        'task': 'safety_tasks.watch_automation_wakeups',
+        'schedule': 60.0,  # Watcher blocks ~50s on the wake list per run
+    },
     'process-scheduled-automation': {
         'task': 'automation_tasks.process_scheduled_automation',
-        'schedule': 60.0,  # Check every minute for scheduled tasks
+        'schedule': 600.0,  # Safety-net poll in case a wakeup is missed
     },
     # Safety monitoring
     'monitor-account-health': {
@@ -114,5 +167,21 @@ celery_app.conf.beat_schedule = {
     },
 }
 
+@worker_process_init.connect
+def _reset_db_pool(**kwargs):
+    """Give each forked worker its own connection pool.
+
+    Pooled connections inherited across fork() are shared file descriptors;
+    disposing the engine here forces fresh connections per worker process.
+    """
+    from database import engine
+    engine.dispose()
+
+@task_postrun.connect
+def _remove_db_session(**kwargs):
+    """Return the scoped session's connection when a task finishes"""
+    from database import SessionLocal
+    SessionLocal.remove()
+
 if __name__ == '__main__':
     celery_app.start()
\ No newline at end of file
@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, scoped_session
 from models import Base
+from contextlib import contextmanager
 import os
 from dotenv import load_dotenv
 import logging
@@ -14,10 +15,36 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./reddit_dashboard.db")
 # Configure engine based on database type
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed during writes and NORMAL sync avoids an
+        # fsync per transaction; both are large write-throughput wins
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.close()
 else:
-    engine = create_engine(DATABASE_URL)
+    # Tuned pool for concurrent Celery workers + API processes: pre-ping
+    # drops stale connections before use, recycle avoids server-side
+    # timeouts, and LIFO reuse keeps the warm connections hot
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=20,
+        max_overflow=10,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        pool_use_lifo=True,
+    )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# scoped_session hands the same thread-local session back to repeated
+# SessionLocal() calls, so hot paths skip a pool checkout per call.
+# Callers may still close() after use; workers call SessionLocal.remove()
+# at task end to return the connection for good.
+SessionLocal = scoped_session(
+    sessionmaker(autocommit=False, autoflush=False, bind=engine)
+)
 
 def get_db():
     db = SessionLocal()
@@ -26,15 +53,52 @@ def get_db():
     finally:
         db.close()
 
-def create_tables():
-    """Create all database tables"""
+@contextmanager
+def session_scope():
+    """Provide a transactional session that commits or rolls back on exit"""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+@contextmanager
+def read_only_session():
+    """Provide a session for query-only work.
+
+    The transaction is always rolled back on exit, so accidental writes
+    from read paths cannot persist. On PostgreSQL the transaction is
+    additionally declared READ ONLY so the server can skip write setup
+    for it; sqlite has no equivalent.
+    """
+    db = SessionLocal()
+    try:
+        if not DATABASE_URL.startswith("sqlite"):
+            from sqlalchemy import text
+            db.execute(text("SET TRANSACTION READ ONLY"))
+        yield db
+    finally:
+        db.rollback()
+        db.close()
+
+def create_tables(reset: bool = False):
+    """Create any missing database tables.
+
+    Dropping everything first is only done when explicitly requested via
+    the reset flag or RESET_DB=1 - recreating the schema on every boot
+    destroyed data and issued one DDL statement per table for nothing.
+    """
     try:
-        # Drop all tables first to ensure schema is up to date
-        Base.metadata.drop_all(bind=engine)
-        logger.info("Dropped existing database tables")
+        if reset or os.getenv("RESET_DB") == "1":
+            Base.metadata.drop_all(bind=engine)
+            logger.info("Dropped existing database tables")
 
-        # Create all tables with current schema
-        Base.metadata.create_all(bind=engine)
+        # create_all already skips tables that exist
+        Base.metadata.create_all(bind=engine, checkfirst=True)
         logger.info("Database tables created successfully")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
@@ -4,30 +4,58 @@ Handles post monitoring, shadowban detection, and health checks for Discord prom
 """
 import logging
 import time
+import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import func, case, bindparam
 
 from models import (
     PromotionCampaign, CampaignPost, SubredditTarget, RedditAccount,
     AccountHealth, EngagementLog, ActivityLog
 )
 from reddit_service import reddit_service
-from database import DATABASE_URL
-from celery import Celery
-
-# Create database session
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from database import SessionLocal, engine
+from celery import Celery, group
+from celery.signals import task_postrun
 
 # Initialize Celery
 celery_app = Celery('discord_promotion_monitoring')
 celery_app.config_from_object('celery_config')
+# Keep this app's Redis footprint bounded like the main worker app
+celery_app.conf.broker_pool_limit = 10
+celery_app.conf.broker_transport_options = {
+    'max_connections': 20,
+    'socket_keepalive': True,
+    'health_check_interval': 30,
+    'visibility_timeout': 3600,
+}
 
 logger = logging.getLogger(__name__)
 
-@celery_app.task
+@task_postrun.connect
+def _remove_db_session(**kwargs):
+    """Return the scoped session's connection when a task finishes"""
+    SessionLocal.remove()
+
+# Cache PRAW instances per refresh token so repeated checks for the same
+# account don't pay an OAuth token-refresh round-trip each time. TTL stays
+# under Reddit's one-hour access-token lifetime.
+_REDDIT_CACHE_TTL = 55 * 60
+_reddit_cache: Dict[str, Any] = {}
+
+def _reddit_for(refresh_token: str):
+    """Get a (cached) authenticated Reddit instance for a refresh token"""
+    now = time.monotonic()
+    cached = _reddit_cache.get(refresh_token)
+    if cached and cached[1] > now:
+        return cached[0]
+    reddit = reddit_service.get_reddit_instance(refresh_token)
+    _reddit_cache[refresh_token] = (reddit, now + _REDDIT_CACHE_TTL)
+    return reddit
+
+# Pacing lives in Celery's token bucket rather than sleep() calls inside
+# the task, so a waiting worker slot is never burned on idle time
+@celery_app.task(rate_limit='30/m')
 def monitor_campaign_posts(campaign_id: int) -> Dict[str, Any]:
     """
     Monitor all posts for a campaign to check for removals, shadowbans, and engagement
@@ -47,11 +75,23 @@ def monitor_campaign_posts(campaign_id: int) -> Dict[str, Any]:
         if not campaign:
             return {'status': 'error', 'message': 'Campaign not found'}
         
-        # Get recent posts that need monitoring (last 7 days)
-        recent_posts = db.query(CampaignPost).filter(
+        # Get recent posts that need monitoring (last 7 days). Select only
+        # the columns the loop reads (as lightweight Row tuples) and join
+        # the account's refresh token in the same query; posts whose account
+        # is disconnected are filtered out up front.
+        checkable_posts = db.query(
+            CampaignPost.id,
+            CampaignPost.post_id,
+            CampaignPost.subreddit,
+            CampaignPost.account_id,
+            RedditAccount.refresh_token
+        ).join(
+            RedditAccount, CampaignPost.account_id == RedditAccount.id
+        ).filter(
             CampaignPost.campaign_id == campaign_id,
             CampaignPost.status == 'success',
-            CampaignPost.posted_at > datetime.utcnow() - timedelta(days=7)
+            CampaignPost.posted_at > datetime.utcnow() - timedelta(days=7),
+            RedditAccount.refresh_token.isnot(None)
         ).all()
         
         monitoring_results = {
@@ -62,56 +102,132 @@ def monitor_campaign_posts(campaign_id: int) -> Dict[str, Any]:
             'shadowban_detected': False,
             'errors': []
         }
-        
-        for post in recent_posts:
+
+        # Batch-fetch current post data: Reddit's info endpoint returns up to
+        # 100 submissions per call, so N posts cost ceil(N/100) round-trips
+        # instead of one request (plus a sleep) per post. PRAW's built-in rate
+        # limiter already paces the requests.
+        submissions_by_id = {}
+        if checkable_posts:
             try:
-                # Get account for this post
-                account = post.account
-                if not account or not account.refresh_token:
-                    continue
-                
-                # Check if post still exists and get current stats
-                post_data = _check_post_status(account.refresh_token, post.post_id)
-                
+                reddit = _reddit_for(checkable_posts[0].refresh_token)
+                fullnames = [f"t3_{post.post_id}" for post in checkable_posts]
+                for chunk_start in range(0, len(fullnames), 100):
+                    chunk = fullnames[chunk_start:chunk_start + 100]
+                    for submission in reddit.info(fullnames=chunk):
+                        submissions_by_id[submission.id] = submission
+            except Exception as e:
+                error_msg = f"Error batch-fetching campaign posts: {str(e)}"
+                monitoring_results['errors'].append(error_msg)
+                logger.error(error_msg)
+
+        # Collect plain update dicts instead of mutating tracked ORM rows.
+        # The network phase only gathers data; the writes happen afterwards
+        # as two uniform executemany statements in one short transaction.
+        stat_updates = []     # _id, upvotes, downvotes, comments_count
+        removal_updates = []  # _id, status, removed_at
+        shadowban_logs = {}  # account_id -> log dict, one entry per account per run
+        shadowban_checked = {}  # account_id -> bool, one API check per account per run
+
+        for post in checkable_posts:
+            try:
+                submission = submissions_by_id.get(post.post_id)
+                if submission is None:
+                    # Fall back to a single-item check before treating the
+                    # post as missing
+                    post_data = _check_post_status(post.refresh_token, post.post_id)
+                else:
+                    post_data = {
+                        'upvotes': submission.score,
+                        'downvotes': 0,  # Reddit doesn't provide downvote count directly
+                        'num_comments': submission.num_comments,
+                        'removed': submission.removed_by_category is not None
+                    }
+
                 if post_data:
                     # Update post statistics
-                    post.upvotes = post_data.get('upvotes', 0)
-                    post.downvotes = post_data.get('downvotes', 0)
-                    post.comments_count = post_data.get('num_comments', 0)
-                    
+                    stat_updates.append({
+                        '_id': post.id,
+                        'upvotes': post_data.get('upvotes', 0),
+                        'downvotes': post_data.get('downvotes', 0),
+                        'comments_count': post_data.get('num_comments', 0)
+                    })
+
                     # Check if post was removed
                     if post_data.get('removed', False):
-                        post.status = 'removed'
-                        post.removed_at = datetime.utcnow()
+                        removal_updates.append({
+                            '_id': post.id,
+                            'status': 'removed',
+                            'removed_at': datetime.utcnow()
+                        })
                         monitoring_results['posts_removed'] += 1
-                        
+
                         # Update subreddit stats
                         _update_subreddit_removal_stats(campaign_id, post.subreddit, db)
-                        
+
                         logger.warning(f"Post {post.post_id} in r/{post.subreddit} was removed")
-                    
+
                     monitoring_results['posts_updated'] += 1
                 else:
                     # Post not found - might be deleted or shadowbanned
-                    post.status = 'removed'
-                    post.removed_at = datetime.utcnow()
+                    removal_updates.append({
+                        '_id': post.id,
+                        'status': 'removed',
+                        'removed_at': datetime.utcnow()
+                    })
                     monitoring_results['posts_removed'] += 1
-                    
-                    # Check for potential shadowban
-                    if _check_potential_shadowban(account.refresh_token, post.subreddit):
+
+                    # Check for potential shadowban - one account-level API
+                    # check per run, whatever its outcome, since the result
+                    # cannot change between posts of the same account
+                    if post.account_id not in shadowban_checked:
+                        try:
+                            shadowban_checked[post.account_id] = \
+                                reddit_service.check_shadowban(post.refresh_token)
+                        except Exception:
+                            shadowban_checked[post.account_id] = False
+
+                    if shadowban_checked[post.account_id] and post.account_id not in shadowban_logs:
                         monitoring_results['shadowban_detected'] = True
-                        _handle_shadowban_detection(account.id, post.subreddit, db)
-                
+                        shadowban_logs[post.account_id] = _handle_shadowban_detection(
+                            post.account_id, post.subreddit, db
+                        )
+
                 monitoring_results['posts_checked'] += 1
-                
-                # Add delay between checks to avoid rate limiting
-                time.sleep(2)
-                
+
             except Exception as e:
                 error_msg = f"Error checking post {post.post_id}: {str(e)}"
                 monitoring_results['errors'].append(error_msg)
                 logger.error(error_msg)
-        
+
+        # Write-behind: all network I/O is done, so the transaction only
+        # holds locks for the duration of two executemany statements
+        if stat_updates or removal_updates:
+            posts_table = CampaignPost.__table__
+            with engine.begin() as conn:
+                if stat_updates:
+                    conn.execute(
+                        posts_table.update()
+                        .where(posts_table.c.id == bindparam('_id'))
+                        .values(
+                            upvotes=bindparam('upvotes'),
+                            downvotes=bindparam('downvotes'),
+                            comments_count=bindparam('comments_count')
+                        ),
+                        stat_updates
+                    )
+                if removal_updates:
+                    conn.execute(
+                        posts_table.update()
+                        .where(posts_table.c.id == bindparam('_id'))
+                        .values(
+                            status=bindparam('status'),
+                            removed_at=bindparam('removed_at')
+                        ),
+                        removal_updates
+                    )
+        if shadowban_logs:
+            db.bulk_insert_mappings(ActivityLog, list(shadowban_logs.values()))
         db.commit()
         
         logger.info(f"Campaign {campaign_id} monitoring complete: {monitoring_results}")
@@ -170,27 +286,25 @@ def check_account_health_for_promotion(account_id: int) -> Dict[str, Any]:
                 health_results['overall_health'] = 'critical'
                 health_results['safe_for_promotion'] = False
             
-            # Check recent promotion activity
-            recent_promotions = db.query(CampaignPost).filter(
-                CampaignPost.account_id == account_id,
-                CampaignPost.posted_at > datetime.utcnow() - timedelta(days=7)
-            ).count()
-            
+            # Check promotion activity and removal rate in one aggregated
+            # query instead of three separate COUNT round-trips
+            recent_cutoff = datetime.utcnow() - timedelta(days=7)
+            post_stats = db.query(
+                func.count().label('total'),
+                func.sum(case((CampaignPost.status == 'removed', 1), else_=0)).label('removed'),
+                func.sum(case((CampaignPost.posted_at > recent_cutoff, 1), else_=0)).label('recent')
+            ).filter(CampaignPost.account_id == account_id).one()
+
+            recent_promotions = post_stats.recent or 0
+            total_posts = post_stats.total or 0
+            removed_posts = post_stats.removed or 0
+
             if recent_promotions > 20:
                 health_results['issues'].append(f'High promotion activity: {recent_promotions} posts in last 7 days')
                 health_results['overall_health'] = 'warning'
                 health_results['recommendations'].append('Consider reducing posting frequency')
-            
-            # Check removal rate
-            total_posts = db.query(CampaignPost).filter(
-                CampaignPost.account_id == account_id
-            ).count()
-            
-            removed_posts = db.query(CampaignPost).filter(
-                CampaignPost.account_id == account_id,
-                CampaignPost.status == 'removed'
-            ).count()
-            
+
+
             if total_posts > 0:
                 removal_rate = (removed_posts / total_posts) * 100
                 if removal_rate > 50:
@@ -250,58 +364,94 @@ def generate_promotion_safety_report(campaign_id: int) -> Dict[str, Any]:
         if not campaign:
             return {'status': 'error', 'message': 'Campaign not found'}
         
-        # Get all posts for this campaign
-        all_posts = db.query(CampaignPost).filter(
+        # Aggregate per-subreddit stats in the database instead of hydrating
+        # every CampaignPost row and tallying in Python
+        subreddit_stats = db.query(
+            CampaignPost.subreddit,
+            func.count().label('total'),
+            func.sum(case((CampaignPost.status == 'removed', 1), else_=0)).label('removed'),
+            func.sum(case((CampaignPost.status == 'success', 1), else_=0)).label('successful')
+        ).filter(
             CampaignPost.campaign_id == campaign_id
-        ).all()
-        
+        ).group_by(CampaignPost.subreddit).all()
+
         # Get unique accounts used
-        account_ids = list(set(post.account_id for post in all_posts))
-        
+        account_ids = [
+            row[0] for row in db.query(CampaignPost.account_id).filter(
+                CampaignPost.campaign_id == campaign_id
+            ).distinct().all()
+        ]
+
         safety_report = {
             'campaign_id': campaign_id,
             'campaign_name': campaign.name,
             'generated_at': datetime.utcnow().isoformat(),
             'overall_safety_score': 0,
             'risk_level': 'low',
-            'total_posts': len(all_posts),
+            'total_posts': sum(row.total for row in subreddit_stats),
             'accounts_used': len(account_ids),
             'issues': [],
             'recommendations': [],
             'account_health': {},
             'subreddit_risks': {}
         }
-        
-        # Analyze account health
-        for account_id in account_ids:
-            health_check = check_account_health_for_promotion.delay(account_id)
-            # Note: In production, you'd want to wait for results or use a different approach
-            
-        # Analyze subreddit performance and risks
-        subreddit_stats = {}
-        for post in all_posts:
-            if post.subreddit not in subreddit_stats:
-                subreddit_stats[post.subreddit] = {
-                    'total': 0, 'removed': 0, 'successful': 0
-                }
-            
-            subreddit_stats[post.subreddit]['total'] += 1
-            if post.status == 'removed':
-                subreddit_stats[post.subreddit]['removed'] += 1
-            elif post.status == 'success':
-                subreddit_stats[post.subreddit]['successful'] += 1
-        
+
+        # Analyze account health: publish the whole fan-out as one group
+        # message and aggregate the results instead of firing N .delay()
+        # calls and discarding what they return
+        if account_ids:
+            health_job = group(
+                check_account_health_for_promotion.s(account_id)
+                for account_id in account_ids
+            ).apply_async()
+            try:
+                for result in health_job.get(timeout=60, disable_sync_subtasks=False):
+                    if result and result.get('account_id') is not None:
+                        safety_report['account_health'][result['account_id']] = result
+            except Exception as e:
+                logger.warning(f"Could not collect account health results: {e}")
+
+            # Vectorize the fleet trust-score math: one pass of numpy array
+            # ops instead of per-account Python arithmetic, then a single
+            # executemany to persist the scores
+            health_rows = list(safety_report['account_health'].values())
+            if health_rows:
+                critical = np.array(
+                    [r.get('overall_health') == 'critical' for r in health_rows], dtype=bool)
+                warning = np.array(
+                    [r.get('overall_health') == 'warning' for r in health_rows], dtype=bool)
+                issue_counts = np.array(
+                    [len(r.get('issues', [])) for r in health_rows], dtype=np.int32)
+
+                scores = np.where(warning, 0.6, 1.0) - issue_counts * 0.1
+                scores = np.where(critical, 0.0, np.clip(scores, 0.0, 1.0))
+
+                health_table = AccountHealth.__table__
+                score_updates = [
+                    {'_account_id': r['account_id'], 'trust_score': float(score)}
+                    for r, score in zip(health_rows, scores)
+                ]
+                for r, score in zip(health_rows, scores):
+                    r['trust_score'] = float(score)
+                with engine.begin() as conn:
+                    conn.execute(
+                        health_table.update()
+                        .where(health_table.c.account_id == bindparam('_account_id'))
+                        .values(trust_score=bindparam('trust_score')),
+                        score_updates
+                    )
+
         # Calculate risk scores
         high_risk_subreddits = []
-        for subreddit, stats in subreddit_stats.items():
-            if stats['total'] > 0:
-                removal_rate = (stats['removed'] / stats['total']) * 100
+        for row in subreddit_stats:
+            if row.total > 0:
+                removal_rate = (row.removed / row.total) * 100
                 if removal_rate > 60:
-                    high_risk_subreddits.append(subreddit)
-                    safety_report['subreddit_risks'][subreddit] = {
+                    high_risk_subreddits.append(row.subreddit)
+                    safety_report['subreddit_risks'][row.subreddit] = {
                         'risk_level': 'high',
                         'removal_rate': removal_rate,
-                        'total_posts': stats['total']
+                        'total_posts': row.total
                     }
         
         # Generate overall safety score and recommendations
@@ -326,7 +476,7 @@ def generate_promotion_safety_report(campaign_id: int) -> Dict[str, Any]:
 def _check_post_status(refresh_token: str, post_id: str) -> Optional[Dict[str, Any]]:
     """Check if a Reddit post still exists and get its current stats"""
     try:
-        reddit = reddit_service.get_reddit_instance(refresh_token)
+        reddit = _reddit_for(refresh_token)
         submission = reddit.submission(id=post_id)
         
         # Try to access post properties
@@ -342,35 +492,29 @@ def _check_post_status(refresh_token: str, post_id: str) -> Optional[Dict[str, A
         logger.warning(f"Could not check post {post_id}: {e}")
         return None
 
-def _check_potential_shadowban(refresh_token: str, subreddit: str) -> bool:
-    """Check if account might be shadowbanned in a specific subreddit"""
-    try:
-        # This is a simplified check - in practice, shadowban detection is complex
-        return reddit_service.check_shadowban(refresh_token)
-    except Exception:
-        return False
+def _handle_shadowban_detection(account_id: int, subreddit: str, db) -> Dict[str, Any]:
+    """Handle detected shadowban by updating account health.
 
-def _handle_shadowban_detection(account_id: int, subreddit: str, db):
-    """Handle detected shadowban by updating account health and logging"""
+    Returns the activity-log row as a plain dict so the caller can batch
+    all detections from one run into a single bulk insert.
+    """
     account_health = db.query(AccountHealth).filter(
         AccountHealth.account_id == account_id
     ).first()
-    
+
     if account_health:
         account_health.shadowbanned = True
         account_health.trust_score = 0.0
-    
-    # Log the detection
-    activity_log = ActivityLog(
-        account_id=account_id,
-        action='shadowban_detected',
-        details={
+
+    return {
+        'account_id': account_id,
+        'action': 'shadowban_detected',
+        'details': {
             'subreddit': subreddit,
             'detected_at': datetime.utcnow().isoformat(),
             'source': 'discord_promotion_monitoring'
         }
-    )
-    db.add(activity_log)
+    }
 
 def _update_subreddit_removal_stats(campaign_id: int, subreddit: str, db):
     """Update subreddit target statistics when a post is removed"""
@@ -5,40 +5,105 @@ Handles scheduled posting, subreddit rotation, and human behavior simulation
 import time
 import random
 import logging
+import redis
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 
 from celery import Celery
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from celery.signals import worker_process_init, task_postrun
+from sqlalchemy import func, and_, update
 
 from models import (
     PromotionCampaign, CampaignPost, SubredditTarget, RedditAccount,
     EngagementLog, ActivityLog, AccountHealth
 )
 from reddit_service import reddit_service
-from database import DATABASE_URL
+from database import SessionLocal, engine
 from behavior_simulation import behavior_simulator, ActivityType
 
-# Create database session
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+@worker_process_init.connect
+def _reset_db_pool(**kwargs):
+    """Dispose inherited pooled connections so each forked worker reconnects"""
+    engine.dispose()
+
+@task_postrun.connect
+def _remove_db_session(**kwargs):
+    """Return the scoped session's connection when a task finishes"""
+    SessionLocal.remove()
 
 # Initialize Celery
 celery_app = Celery('discord_promotion_tasks')
 celery_app.config_from_object('celery_config')
 
+# Promotion tasks are network-bound (Reddit HTTP calls), so they live on
+# their own queue and suit a green-thread worker, e.g.:
+#   celery -A discord_promotion_tasks worker -P eventlet -c 18 -Q promotion
+# Scheduling tasks stay on the default queue with the prefork pool.
+celery_app.conf.task_routes = {
+    'discord_promotion_tasks.automated_discord_promotion': {'queue': 'promotion'},
+    'discord_promotion_tasks._execute_discord_promotion_post': {'queue': 'promotion'},
+}
+
+# Long-lived workers accumulate RSS from ORM/logging churn; recycling a
+# child every 200 tasks bounds the working set. Prefetch of 1 plus
+# starting workers with -Ofair stops a long post from holding a queue of
+# prefetched tasks hostage behind it.
+celery_app.conf.worker_max_tasks_per_child = 200
+celery_app.conf.worker_prefetch_multiplier = 1
+
 logger = logging.getLogger(__name__)
 
+# Redis-backed post counters replace COUNT(*) range scans in the
+# rate-limit checks; the DB counts remain as a fallback when Redis is
+# unreachable
+redis_client = redis.Redis(
+    host='localhost',
+    port=6379,
+    db=1,  # Same rate-limiting DB as safety_tasks
+    decode_responses=True
+)
+
+def _daily_post_key(campaign_id: int) -> str:
+    return f"camp:{campaign_id}:d:{datetime.utcnow():%Y%m%d}"
+
+def _recent_post_key(campaign_id: int, account_id: int) -> str:
+    return f"camp:{campaign_id}:acct:{account_id}:2h"
+
+def _record_post_counters(campaign_id: int, account_id: int) -> None:
+    """Bump the O(1) rate-limit counters after a post attempt"""
+    try:
+        pipe = redis_client.pipeline()
+        pipe.incr(_daily_post_key(campaign_id))
+        pipe.expire(_daily_post_key(campaign_id), 48 * 3600)
+        pipe.incr(_recent_post_key(campaign_id, account_id))
+        pipe.expire(_recent_post_key(campaign_id, account_id), 2 * 3600)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Could not update promotion counters in Redis: {e}")
+
+# Only these keys of a Reddit submit result are worth persisting; the
+# full API response bloats JSON columns and serialization time
+_SAFE_RESULT_KEYS = ('post_id', 'permalink', 'success', 'error')
+
+def _slim_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a Reddit API result to the whitelisted keys for log storage"""
+    return {k: result.get(k) for k in _SAFE_RESULT_KEYS if k in result}
+
 @celery_app.task(bind=True, max_retries=3)
 def automated_discord_promotion(self, campaign_id: int, account_id: int) -> Dict[str, Any]:
     """
-    Perform automated Discord promotion posting with human behavior simulation
-    
+    Prepare an automated Discord promotion post with human behavior simulation
+
+    Runs the safety, rate-limit and subreddit-selection checks, then hands
+    the actual submission to _execute_discord_promotion_post with the
+    human-like delay expressed as a broker countdown. Sleeping in the
+    worker held a DB session and a worker slot for 30-240 seconds per
+    post; the countdown keeps both free while the delay elapses.
+
     Args:
         campaign_id: Campaign to post for
         account_id: Account to use for posting
-        
+
     Returns:
         Task execution result
     """
@@ -48,49 +113,100 @@ def automated_discord_promotion(self, campaign_id: int, account_id: int) -> Dict
         campaign = db.query(PromotionCampaign).filter(
             PromotionCampaign.id == campaign_id
         ).first()
-        
+
         if not campaign or not campaign.is_active:
             return {'status': 'skipped', 'reason': 'campaign_inactive'}
-        
+
         account = db.query(RedditAccount).filter(
             RedditAccount.id == account_id
         ).first()
-        
+
         if not account or not account.refresh_token:
             return {'status': 'skipped', 'reason': 'account_invalid'}
-        
+
         # Safety checks
         if not _is_account_safe_for_promotion(account_id, db):
             logger.warning(f"Account {account_id} not safe for Discord promotion")
             return {'status': 'skipped', 'reason': 'account_not_safe'}
-        
+
         # Check rate limits
         if not _check_promotion_rate_limits(campaign_id, account_id, db):
             logger.warning(f"Rate limit exceeded for campaign {campaign_id}, account {account_id}")
             return {'status': 'skipped', 'reason': 'rate_limit_exceeded'}
-        
+
         # Human behavior simulation
         activity_probability = behavior_simulator.calculate_activity_probability(
             account_id, ActivityType.POST
         )
-        
+
         if random.random() > activity_probability:
             logger.info(f"Skipping Discord promotion due to behavior simulation")
             return {'status': 'skipped', 'reason': 'behavior_simulation'}
-        
+
         # Select optimal subreddit
         target_subreddit = _select_optimal_subreddit_for_campaign(campaign_id, db)
         if not target_subreddit:
             return {'status': 'skipped', 'reason': 'no_available_subreddits'}
-        
-        # Simulate human delay before posting
-        delay = _simulate_human_delay_for_promotion()
-        logger.info(f"Simulating human delay for Discord promotion: {delay:.1f} seconds")
-        time.sleep(delay)
-        
+
+    except Exception as e:
+        logger.error(f"Error preparing automated Discord promotion: {e}")
+        db.rollback()
+
+        # Retry logic
+        if self.request.retries < self.max_retries:
+            logger.info(f"Retrying automated Discord promotion task (attempt {self.request.retries + 1})")
+            raise self.retry(countdown=60 * (2 ** self.request.retries))
+
+        return {
+            'status': 'error',
+            'error': str(e),
+            'campaign_id': campaign_id,
+            'account_id': account_id
+        }
+
+    finally:
+        db.close()
+
+    # Simulate human delay via broker countdown rather than time.sleep;
+    # the session above is already closed before the delay starts
+    delay = _simulate_human_delay_for_promotion()
+    logger.info(f"Scheduling Discord promotion post in {delay:.1f} seconds")
+    _execute_discord_promotion_post.apply_async(
+        args=[campaign_id, account_id, target_subreddit],
+        countdown=delay
+    )
+
+    return {
+        'status': 'scheduled',
+        'subreddit': target_subreddit,
+        'delay': round(delay, 1),
+        'campaign_id': campaign_id,
+        'account_id': account_id
+    }
+
+@celery_app.task(bind=True, max_retries=3)
+def _execute_discord_promotion_post(self, campaign_id: int, account_id: int,
+                                    target_subreddit: str) -> Dict[str, Any]:
+    """Submit a prepared Discord promotion post and record the outcome"""
+    db = SessionLocal()
+    try:
+        campaign = db.query(PromotionCampaign).filter(
+            PromotionCampaign.id == campaign_id
+        ).first()
+
+        if not campaign or not campaign.is_active:
+            return {'status': 'skipped', 'reason': 'campaign_inactive'}
+
+        account = db.query(RedditAccount).filter(
+            RedditAccount.id == account_id
+        ).first()
+
+        if not account or not account.refresh_token:
+            return {'status': 'skipped', 'reason': 'account_invalid'}
+
         # Determine URL to post
         post_url = campaign.short_url if campaign.short_url else campaign.discord_url
-        
+
         # Submit the promotion post
         try:
             result = reddit_service.submit_post(
@@ -107,7 +223,7 @@ def automated_discord_promotion(self, campaign_id: int, account_id: int) -> Dict
                 subreddit=target_subreddit,
                 status='success' if result.get('success') else 'failed',
                 error_message=result.get('error') if not result.get('success') else None,
-                details=result
+                details=_slim_result(result)
             )
             
             if result.get('success'):
@@ -115,8 +231,10 @@ def automated_discord_promotion(self, campaign_id: int, account_id: int) -> Dict
                 campaign_post.permalink = result.get('permalink')
             
             db.add(campaign_post)
-            
-            # Log engagement
+            db.flush()  # Assigns campaign_post.id for the engagement reference
+
+            # Log engagement - the campaign post row already carries the
+            # submit result, so only reference it instead of repeating it
             engagement_log = EngagementLog(
                 account_id=account_id,
                 action_type='automated_discord_promotion',
@@ -125,19 +243,18 @@ def automated_discord_promotion(self, campaign_id: int, account_id: int) -> Dict
                 status='success' if result.get('success') else 'failed',
                 details={
                     'campaign_id': campaign_id,
-                    'campaign_name': campaign.name,
-                    'discord_url': post_url,
-                    'automated': True,
-                    'result': result
+                    'campaign_post_id': campaign_post.id,
+                    'automated': True
                 }
             )
             db.add(engagement_log)
-            
+
             # Update subreddit statistics
             _update_subreddit_promotion_stats(campaign_id, target_subreddit, result.get('success', False), db)
-            
+
             db.commit()
-            
+            _record_post_counters(campaign_id, account_id)
+
             if result.get('success'):
                 logger.info(f"Automated Discord promotion successful: r/{target_subreddit} - {result.get('post_id')}")
                 return {
@@ -174,7 +291,8 @@ def automated_discord_promotion(self, campaign_id: int, account_id: int) -> Dict
             
             _update_subreddit_promotion_stats(campaign_id, target_subreddit, False, db)
             db.commit()
-            
+            _record_post_counters(campaign_id, account_id)
+
             return {
                 'status': 'failed',
                 'error': str(reddit_error),
@@ -242,23 +360,32 @@ def schedule_campaign_posts(campaign_id: int) -> Dict[str, Any]:
         randomization_minutes = schedule_config.get('randomization_minutes', 60)
         max_posts_per_day = schedule_config.get('max_posts_per_day', 4)
         
-        # Check how many posts were made today
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_posts = db.query(CampaignPost).filter(
-            CampaignPost.campaign_id == campaign_id,
-            CampaignPost.posted_at >= today_start
-        ).count()
-        
+        # Check how many posts were made today (Redis counter, DB fallback)
+        try:
+            today_posts = int(redis_client.get(_daily_post_key(campaign_id)) or 0)
+        except redis.RedisError:
+            # Only "at least max_posts_per_day" matters, so fetch at most
+            # that many ids instead of counting the whole day's range
+            today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            today_posts = len(db.query(CampaignPost.id).filter(
+                CampaignPost.campaign_id == campaign_id,
+                CampaignPost.posted_at >= today_start
+            ).limit(max_posts_per_day).all())
+
         if today_posts >= max_posts_per_day:
             return {'status': 'skipped', 'reason': 'daily_limit_reached'}
         
-        # Schedule next post
+        # Schedule next post. A per-call RNG seeded from the campaign and
+        # the current interval avoids the global PRNG lock when many beat
+        # ticks fire at once and makes a campaign's jitter reproducible
+        # within an interval
+        rng = random.Random(hash((campaign_id, int(time.time() // (interval_hours * 3600)))))
         base_delay = interval_hours * 3600  # Convert to seconds
-        randomization = random.randint(-randomization_minutes * 60, randomization_minutes * 60)
+        randomization = rng.randint(-randomization_minutes * 60, randomization_minutes * 60)
         delay = max(300, base_delay + randomization)  # Minimum 5 minutes
-        
+
         # Select account (rotate or random)
-        account = random.choice(available_accounts)
+        account = rng.choice(available_accounts)
         
         # Schedule the task
         task = automated_discord_promotion.apply_async(
@@ -293,72 +420,206 @@ def schedule_campaign_posts(campaign_id: int) -> Dict[str, Any]:
     finally:
         db.close()
 
+@celery_app.task
+def schedule_all_due_campaigns() -> Dict[str, Any]:
+    """
+    Schedule posts for every active campaign in one pass
+
+    Replaces per-campaign schedule_campaign_posts fan-out for periodic
+    scheduling: one LEFT JOIN pulls each active campaign with its post
+    count for today, and the eligible accounts are fetched once, so DB
+    round-trips stay constant no matter how many campaigns exist.
+
+    Returns:
+        Scheduling result across all campaigns
+    """
+    db = SessionLocal()
+    try:
+        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        campaign_rows = db.query(
+            PromotionCampaign,
+            func.count(CampaignPost.id).label('today_posts')
+        ).outerjoin(
+            CampaignPost,
+            and_(
+                CampaignPost.campaign_id == PromotionCampaign.id,
+                CampaignPost.posted_at >= today_start
+            )
+        ).filter(
+            PromotionCampaign.is_active == True
+        ).group_by(PromotionCampaign.id).all()
+
+        if not campaign_rows:
+            return {'status': 'skipped', 'reason': 'no_active_campaigns'}
+
+        # One account query shared by every campaign below
+        available_accounts = db.query(RedditAccount).filter(
+            RedditAccount.refresh_token.isnot(None)
+        ).all()
+
+        if not available_accounts:
+            return {'status': 'skipped', 'reason': 'no_available_accounts'}
+
+        scheduled_tasks = []
+        skipped_campaigns = []
+
+        for campaign, today_posts in campaign_rows:
+            schedule_config = campaign.posting_schedule
+            if not schedule_config:
+                skipped_campaigns.append({'campaign_id': campaign.id, 'reason': 'no_schedule_config'})
+                continue
+
+            interval_hours = schedule_config.get('interval_hours', 6)
+            randomization_minutes = schedule_config.get('randomization_minutes', 60)
+            max_posts_per_day = schedule_config.get('max_posts_per_day', 4)
+
+            if today_posts >= max_posts_per_day:
+                skipped_campaigns.append({'campaign_id': campaign.id, 'reason': 'daily_limit_reached'})
+                continue
+
+            base_delay = interval_hours * 3600
+            randomization = random.randint(-randomization_minutes * 60, randomization_minutes * 60)
+            delay = max(300, base_delay + randomization)  # Minimum 5 minutes
+
+            account = random.choice(available_accounts)
+
+            task = automated_discord_promotion.apply_async(
+                args=[campaign.id, account.id],
+                countdown=delay
+            )
+
+            scheduled_tasks.append({
+                'task_id': task.id,
+                'campaign_id': campaign.id,
+                'account_id': account.id,
+                'scheduled_for': datetime.utcnow() + timedelta(seconds=delay),
+                'delay_seconds': delay
+            })
+
+        logger.info(f"Scheduled {len(scheduled_tasks)} campaign posts in one pass")
+
+        return {
+            'status': 'success',
+            'scheduled_tasks': scheduled_tasks,
+            'skipped_campaigns': skipped_campaigns
+        }
+
+    except Exception as e:
+        logger.error(f"Error scheduling due campaigns: {e}")
+        return {'status': 'error', 'error': str(e)}
+
+    finally:
+        db.close()
+
+# Safety verdicts barely change second-to-second, so a short TTL cache
+# absorbs the repeated AccountHealth SELECTs from bursty scheduling
+_SAFETY_CACHE_TTL = 60
+_safety_cache: Dict[int, tuple] = {}
+
+def _invalidate_safety_cache(account_id: int) -> None:
+    """Drop the cached safety verdict after a health update"""
+    _safety_cache.pop(account_id, None)
+
 def _is_account_safe_for_promotion(account_id: int, db) -> bool:
     """Check if account is safe for Discord promotion"""
+    cached = _safety_cache.get(account_id)
+    if cached and time.monotonic() - cached[1] < _SAFETY_CACHE_TTL:
+        return cached[0]
+
     account_health = db.query(AccountHealth).filter(
         AccountHealth.account_id == account_id
     ).first()
-    
-    if not account_health:
-        return False
-    
+
     # Safety criteria for Discord promotion
-    if account_health.shadowbanned:
-        return False
-    
-    if account_health.captcha_triggered:
-        return False
-    
-    if account_health.trust_score < 0.5:
-        return False
-    
-    if account_health.bans > 0:
-        return False
-    
-    return True
+    safe = bool(
+        account_health
+        and not account_health.shadowbanned
+        and not account_health.captcha_triggered
+        and account_health.trust_score >= 0.5
+        and account_health.bans == 0
+    )
+
+    _safety_cache[account_id] = (safe, time.monotonic())
+    return safe
 
 def _check_promotion_rate_limits(campaign_id: int, account_id: int, db) -> bool:
     """Check if posting rate limits are respected"""
-    # Check recent posts for this campaign and account
-    recent_posts = db.query(CampaignPost).filter(
-        CampaignPost.campaign_id == campaign_id,
-        CampaignPost.account_id == account_id,
-        CampaignPost.posted_at > datetime.utcnow() - timedelta(hours=2)
-    ).count()
-    
+    # Check recent posts for this campaign and account via the O(1)
+    # Redis counter, falling back to the DB range count if Redis is down
+    try:
+        recent_posts = int(redis_client.get(_recent_post_key(campaign_id, account_id)) or 0)
+    except redis.RedisError:
+        # EXISTS-style probe: stop at the first matching row instead of
+        # counting the whole index range
+        recent_post = db.query(CampaignPost.id).filter(
+            CampaignPost.campaign_id == campaign_id,
+            CampaignPost.account_id == account_id,
+            CampaignPost.posted_at > datetime.utcnow() - timedelta(hours=2)
+        ).limit(1).first()
+        recent_posts = 0 if recent_post is None else 1
+
     # Limit to 1 post per 2 hours per account per campaign
     return recent_posts == 0
 
-def _select_optimal_subreddit_for_campaign(campaign_id: int, db) -> Optional[str]:
-    """Select optimal subreddit for automated posting"""
-    targets = db.query(SubredditTarget).filter(
+# Subreddit targets only change on operator edits, so a short TTL cache
+# of lightweight rows avoids re-hydrating them on every task
+_TARGETS_CACHE_TTL = 120
+_targets_cache: Dict[int, tuple] = {}
+
+def _invalidate_targets_cache(campaign_id: int) -> None:
+    """Drop cached targets after an operator edits a campaign's list"""
+    _targets_cache.pop(campaign_id, None)
+
+def _get_campaign_targets(campaign_id: int, db) -> list:
+    """Return the active targets for a campaign, ranked, with a short TTL"""
+    cached = _targets_cache.get(campaign_id)
+    if cached and time.monotonic() - cached[1] < _TARGETS_CACHE_TTL:
+        return cached[0]
+
+    targets = db.query(
+        SubredditTarget.subreddit_name,
+        SubredditTarget.is_preferred,
+        SubredditTarget.success_rate
+    ).filter(
         SubredditTarget.campaign_id == campaign_id,
         SubredditTarget.is_active == True
     ).order_by(
         SubredditTarget.priority.asc(),
         SubredditTarget.success_rate.desc()
     ).all()
-    
+
+    _targets_cache[campaign_id] = (targets, time.monotonic())
+    return targets
+
+def _select_optimal_subreddit_for_campaign(campaign_id: int, db) -> Optional[str]:
+    """Select optimal subreddit for automated posting"""
+    targets = _get_campaign_targets(campaign_id, db)
     if not targets:
         return None
-    
-    # Prefer subreddits not posted to in last 8 hours
-    for target in targets:
-        recent_post = db.query(CampaignPost).filter(
+
+    # Only the recency check needs fresh data: one narrow DISTINCT query
+    # instead of probing CampaignPost once per target
+    recent_cutoff = datetime.utcnow() - timedelta(hours=8)
+    recent_subreddits = {
+        row[0] for row in db.query(CampaignPost.subreddit).filter(
             CampaignPost.campaign_id == campaign_id,
-            CampaignPost.subreddit == target.subreddit_name,
-            CampaignPost.posted_at > datetime.utcnow() - timedelta(hours=8)
-        ).first()
-        
-        if not recent_post:
-            return target.subreddit_name
-    
-    # Fallback to preferred subreddits
-    preferred = [t for t in targets if t.is_preferred]
-    if preferred:
-        return random.choice(preferred).subreddit_name
-    
-    return random.choice(targets).subreddit_name
+            CampaignPost.posted_at > recent_cutoff
+        ).distinct().all()
+    }
+
+    # Single weighted pick replaces the ranked-loop-plus-fallbacks:
+    # recently-posted targets are heavily downweighted rather than
+    # excluded, preferred targets get a boost, and higher success rates
+    # win more often. When every target was hit recently the relative
+    # weights still hold, so no separate fallback pass is needed.
+    weights = [
+        (target.success_rate + 1)
+        * (0.1 if target.subreddit_name in recent_subreddits else 1)
+        * (2 if target.is_preferred else 1)
+        for target in targets
+    ]
+    return random.choices(targets, weights=weights, k=1)[0].subreddit_name
 
 def _simulate_human_delay_for_promotion() -> float:
     """Simulate human-like delay for Discord promotion posts"""
@@ -369,17 +630,21 @@ def _simulate_human_delay_for_promotion() -> float:
 
 def _update_subreddit_promotion_stats(campaign_id: int, subreddit: str, success: bool, db):
     """Update subreddit target statistics for promotion"""
-    target = db.query(SubredditTarget).filter(
-        SubredditTarget.campaign_id == campaign_id,
-        SubredditTarget.subreddit_name == subreddit
-    ).first()
-    
-    if target:
-        target.total_posts += 1
-        if success:
-            target.successful_posts += 1
-        else:
-            target.removed_posts += 1
-        
-        target.success_rate = (target.successful_posts / target.total_posts) * 100
-        target.last_posted = datetime.utcnow()
+    # One atomic UPDATE with server-side arithmetic: no SELECT round-trip
+    # and no lost increments when two posts finish concurrently
+    success_inc = 1 if success else 0
+    db.execute(
+        update(SubredditTarget)
+        .where(
+            SubredditTarget.campaign_id == campaign_id,
+            SubredditTarget.subreddit_name == subreddit
+        )
+        .values(
+            total_posts=SubredditTarget.total_posts + 1,
+            successful_posts=SubredditTarget.successful_posts + success_inc,
+            removed_posts=SubredditTarget.removed_posts + (1 - success_inc),
+            success_rate=(SubredditTarget.successful_posts + success_inc) * 100.0
+                         / (SubredditTarget.total_posts + 1),
+            last_posted=datetime.utcnow(),
+        )
+    )
@@ -6,9 +6,9 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, func
 
-from database import SessionLocal
+from database import SessionLocal, session_scope
 from models import RedditAccount, EngagementLog, ActivityLog
 from reddit_service import reddit_service
 
@@ -22,45 +22,39 @@ class EngagementService:
                       subreddit: str, status: str = "success", details: Dict[str, Any] = None) -> bool:
         """Log an engagement action (upvote, comment, post)"""
         try:
-            db = SessionLocal()
-            
-            # Verify account exists
-            account = db.query(RedditAccount).filter(RedditAccount.id == account_id).first()
-            if not account:
-                logger.error(f"Account {account_id} not found")
-                return False
-            
-            # Create engagement log entry
-            engagement_log = EngagementLog(
-                account_id=account_id,
-                timestamp=datetime.utcnow(),
-                action_type=action_type,
-                target_id=target_id,
-                subreddit=subreddit,
-                status=status,
-                details=details or {}
-            )
-            
-            db.add(engagement_log)
-            db.commit()
-            
-            logger.info(f"Engagement logged: {action_type} on {target_id} in r/{subreddit} - {status}")
-            
-            # Also log as activity
-            self._log_activity(db, account_id, f"{action_type}_{status}", {
-                "target_id": target_id,
-                "subreddit": subreddit,
-                "details": details
-            })
-            
-            db.close()
+            with session_scope() as db:
+                # Verify account exists
+                account = db.query(RedditAccount).filter(RedditAccount.id == account_id).first()
+                if not account:
+                    logger.error(f"Account {account_id} not found")
+                    return False
+
+                # Create engagement log entry
+                engagement_log = EngagementLog(
+                    account_id=account_id,
+                    timestamp=datetime.utcnow(),
+                    action_type=action_type,
+                    target_id=target_id,
+                    subreddit=subreddit,
+                    status=status,
+                    details=details or {}
+                )
+
+                db.add(engagement_log)
+
+                logger.info(f"Engagement logged: {action_type} on {target_id} in r/{subreddit} - {status}")
+
+                # Also log as activity
+                self._log_activity(db, account_id, f"{action_type}_{status}", {
+                    "target_id": target_id,
+                    "subreddit": subreddit,
+                    "details": details
+                })
+
             return True
-            
+
         except Exception as e:
             logger.error(f"Error logging engagement: {e}")
-            if 'db' in locals():
-                db.rollback()
-                db.close()
             return False
     
     def log_upvote(self, account_id: int, post_or_comment_id: str, subreddit: str, 
@@ -82,8 +76,9 @@ class EngagementService:
                    comment_text: str, success: bool = True, error_message: str = None) -> bool:
         """Log a comment action"""
         status = "success" if success else "failed"
+        suffix = "..." if len(comment_text) > 100 else ""
         details = {
-            "comment_text": comment_text[:100] + "..." if len(comment_text) > 100 else comment_text,
+            "comment_text": comment_text[:100] + suffix,
             "comment_length": len(comment_text)
         }
         
@@ -121,28 +116,38 @@ class EngagementService:
             details=details
         )
     
-    def get_engagement_history(self, account_id: int, days: int = 30, 
-                              action_type: str = None) -> List[Dict[str, Any]]:
-        """Get engagement history for an account"""
+    def get_engagement_history(self, account_id: int, days: int = 30,
+                              action_type: str = None, limit: int = 200,
+                              before: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Get engagement history for an account.
+
+        Results are capped at `limit` rows; pass the last item's timestamp
+        as `before` to fetch the next page (keyset pagination), keeping
+        memory bounded regardless of account activity.
+        """
         try:
             db = SessionLocal()
-            
+
             # Calculate date range
             end_date = datetime.utcnow()
             start_date = end_date - timedelta(days=days)
-            
+
             # Build query
             query = db.query(EngagementLog).filter(
                 EngagementLog.account_id == account_id,
                 EngagementLog.timestamp >= start_date,
                 EngagementLog.timestamp <= end_date
             )
-            
+
             # Filter by action type if specified
             if action_type:
                 query = query.filter(EngagementLog.action_type == action_type)
-            
-            engagement_logs = query.order_by(desc(EngagementLog.timestamp)).all()
+
+            # Keyset cursor: everything strictly older than `before`
+            if before:
+                query = query.filter(EngagementLog.timestamp < before)
+
+            engagement_logs = query.order_by(desc(EngagementLog.timestamp)).limit(limit).all()
             
             # Convert to list of dictionaries
             history = []
@@ -175,15 +180,27 @@ class EngagementService:
             end_date = datetime.utcnow()
             start_date = end_date - timedelta(days=days)
             
-            # Get engagement logs
-            engagement_logs = db.query(EngagementLog).filter(
+            # Aggregate in the database instead of tallying hydrated rows;
+            # each GROUP BY returns at most a handful of rows
+            window_filter = (
                 EngagementLog.account_id == account_id,
                 EngagementLog.timestamp >= start_date
-            ).all()
-            
+            )
+
+            total_actions = db.query(func.count(EngagementLog.id)).filter(*window_filter).scalar() or 0
+            action_counts = db.query(
+                EngagementLog.action_type, func.count()
+            ).filter(*window_filter).group_by(EngagementLog.action_type).all()
+            status_counts = db.query(
+                EngagementLog.status, func.count()
+            ).filter(*window_filter).group_by(EngagementLog.status).all()
+            subreddit_counts = db.query(
+                EngagementLog.subreddit, func.count()
+            ).filter(*window_filter).group_by(EngagementLog.subreddit).all()
+
             # Initialize stats
             stats = {
-                "total_actions": len(engagement_logs),
+                "total_actions": total_actions,
                 "by_action_type": {"upvote": 0, "comment": 0, "post": 0},
                 "by_status": {"success": 0, "failed": 0, "removed": 0},
                 "by_subreddit": {},
@@ -192,33 +209,31 @@ class EngagementService:
                 "most_active_subreddit": None,
                 "period_days": days
             }
-            
-            # Analyze logs
-            for log in engagement_logs:
-                # Count by action type
-                if log.action_type in stats["by_action_type"]:
-                    stats["by_action_type"][log.action_type] += 1
-                
-                # Count by status
-                if log.status in stats["by_status"]:
-                    stats["by_status"][log.status] += 1
-                
-                # Count by subreddit
-                if log.subreddit:
-                    if log.subreddit not in stats["by_subreddit"]:
-                        stats["by_subreddit"][log.subreddit] = 0
-                    stats["by_subreddit"][log.subreddit] += 1
-            
+
+            for action_type, count in action_counts:
+                if action_type in stats["by_action_type"]:
+                    stats["by_action_type"][action_type] = count
+
+            for status_value, count in status_counts:
+                if status_value in stats["by_status"]:
+                    stats["by_status"][status_value] = count
+
+            # Streaming argmax: track the busiest subreddit in the same
+            # pass instead of rescanning the dict afterwards
+            best_subreddit, best_count = None, -1
+            for subreddit, count in subreddit_counts:
+                if subreddit:
+                    stats["by_subreddit"][subreddit] = count
+                    if count > best_count:
+                        best_subreddit, best_count = subreddit, count
+            stats["most_active_subreddit"] = best_subreddit
+
             # Calculate success rate
             if stats["total_actions"] > 0:
                 success_count = stats["by_status"]["success"]
                 stats["success_rate"] = round((success_count / stats["total_actions"]) * 100, 2)
                 stats["daily_average"] = round(stats["total_actions"] / days, 2)
-            
-            # Find most active subreddit
-            if stats["by_subreddit"]:
-                stats["most_active_subreddit"] = max(stats["by_subreddit"], key=stats["by_subreddit"].get)
-            
+
             db.close()
             return stats
             
@@ -237,22 +252,31 @@ class EngagementService:
             end_date = datetime.utcnow()
             start_date = end_date - timedelta(days=days)
             
-            # Get engagement logs
-            engagement_logs = db.query(EngagementLog).filter(
+            # One GROUP BY returns the whole (subreddit, action, status)
+            # matrix pre-counted; Python only reshapes ~distinct-subreddit
+            # rows instead of every log
+            grouped = db.query(
+                EngagementLog.subreddit,
+                EngagementLog.action_type,
+                EngagementLog.status,
+                func.count()
+            ).filter(
                 EngagementLog.account_id == account_id,
-                EngagementLog.timestamp >= start_date
+                EngagementLog.timestamp >= start_date,
+                EngagementLog.subreddit.isnot(None)
+            ).group_by(
+                EngagementLog.subreddit,
+                EngagementLog.action_type,
+                EngagementLog.status
             ).all()
-            
+
             # Group by subreddit
             subreddit_data = {}
-            
-            for log in engagement_logs:
-                if not log.subreddit:
-                    continue
-                
-                if log.subreddit not in subreddit_data:
-                    subreddit_data[log.subreddit] = {
-                        "subreddit": log.subreddit,
+
+            for subreddit, action_type, status_value, count in grouped:
+                if subreddit not in subreddit_data:
+                    subreddit_data[subreddit] = {
+                        "subreddit": subreddit,
                         "total_actions": 0,
                         "upvotes": 0,
                         "comments": 0,
@@ -261,22 +285,23 @@ class EngagementService:
                         "failed_count": 0,
                         "success_rate": 0
                     }
-                
-                data = subreddit_data[log.subreddit]
-                data["total_actions"] += 1
-                
-                if log.action_type == "upvote":
-                    data["upvotes"] += 1
-                elif log.action_type == "comment":
-                    data["comments"] += 1
-                elif log.action_type == "post":
-                    data["posts"] += 1
-                
-                if log.status == "success":
-                    data["success_count"] += 1
-                elif log.status == "failed":
-                    data["failed_count"] += 1
-            
+
+                data = subreddit_data[subreddit]
+                data["total_actions"] += count
+
+                if action_type == "upvote":
+                    data["upvotes"] += count
+                elif action_type == "comment":
+                    data["comments"] += count
+                elif action_type == "post":
+                    data["posts"] += count
+
+                if status_value == "success":
+                    data["success_count"] += count
+                elif status_value == "failed":
+                    data["failed_count"] += count
+
+
             # Calculate success rates
             for data in subreddit_data.values():
                 if data["total_actions"] > 0:
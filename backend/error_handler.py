@@ -2,104 +2,217 @@
 Centralized error handling and logging for Reddit Dashboard
 """
 
+import asyncio
+import atexit
+import collections
+import functools
 import logging
+import logging.handlers
+import queue
+import string
+import sys
+import threading
+import time
 import traceback
 from datetime import datetime
+from types import MappingProxyType
 from typing import Dict, Any, Optional
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
+
+# orjson encodes the large traceback strings in error payloads several
+# times faster than stdlib json; fall back cleanly when not installed
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as ErrorJSONResponse
+except ImportError:
+    ErrorJSONResponse = JSONResponse
 from sqlalchemy.exc import SQLAlchemyError
-import praw.exceptions
 
 from database import SessionLocal
 from models import ActivityLog
 
-# Configure logging
+@functools.cache
+def _praw_exceptions():
+    """Import praw.exceptions on first use.
+
+    Importing PRAW eagerly drags its whole dependency graph into every
+    worker's cold start; by the time a PRAW error needs handling the
+    package is necessarily already in sys.modules, so this costs nothing.
+    """
+    import praw.exceptions
+    return praw.exceptions
+
+# Configure logging. Log callers only enqueue the record in memory; a
+# QueueListener thread owns the file and stream handlers, keeping file
+# I/O latency off the request path when error rates spike.
+_log_queue: queue.Queue = queue.Queue(-1)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('reddit_dashboard.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
+)
+
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.FileHandler('reddit_dashboard.log'),
+    logging.StreamHandler()
 )
+_log_listener.start()
 
 logger = logging.getLogger(__name__)
 
+# Error records land in a bounded drop-oldest ring buffer flushed to the
+# DB in batches by a daemon thread: an error storm costs one commit per
+# batch instead of one synchronous commit per error on the request
+# thread, and a slow or down DB can never grow memory past maxlen.
+_ERROR_FLUSH_INTERVAL = 1.0  # seconds
+_error_buf: collections.deque = collections.deque(maxlen=10000)
+_error_buf_lock = threading.Lock()
+_error_event = threading.Event()
+_dropped_errors = 0
+
+def _drain_error_queue():
+    """Flush buffered error records to the DB in batches"""
+    global _dropped_errors
+    # One long-lived session for the writer thread: each flush is just an
+    # executemany INSERT + commit, with no per-batch pool checkout.
+    # bulk_insert_mappings takes the dicts straight from the buffer and
+    # skips ORM identity-map bookkeeping.
+    session = SessionLocal()
+    atexit.register(session.close)
+    while True:
+        # Wake on the first record, then let a batch accumulate
+        _error_event.wait()
+        time.sleep(_ERROR_FLUSH_INTERVAL)
+        with _error_buf_lock:
+            batch = list(_error_buf)
+            _error_buf.clear()
+            _error_event.clear()
+            dropped, _dropped_errors = _dropped_errors, 0
+
+        if dropped:
+            logger.error(f"Error buffer overflowed; dropped {dropped} oldest records")
+        if not batch:
+            continue
+
+        try:
+            session.bulk_insert_mappings(ActivityLog, batch)
+            session.commit()
+        except Exception as db_error:
+            session.rollback()
+            logger.error(f"Failed to flush {len(batch)} error logs to database: {db_error}")
+
+_error_writer = threading.Thread(
+    target=_drain_error_queue, name='error-log-writer', daemon=True
+)
+_error_writer.start()
+
+# Pre-built response templates, hoisted so handle_reddit_api_error does
+# not reallocate them per error. Read-only via MappingProxyType.
+_REDDIT_ERROR_RESPONSES = MappingProxyType({
+    'RATELIMIT': {
+        "error": "Rate limit exceeded",
+        "message": "Please wait before making more requests",
+        "retry_after": 60
+    },
+    'INVALID_USER': {
+        "error": "Invalid user",
+        "message": "The specified user does not exist"
+    },
+    'SUBREDDIT_NOEXIST': {
+        "error": "Subreddit does not exist",
+        "message": "The specified subreddit was not found"
+    },
+    'NO_TEXT': {
+        "error": "No text provided",
+        "message": "Text content is required for this action"
+    },
+    'TOO_LONG': {
+        "error": "Content too long",
+        "message": "The provided content exceeds the maximum length"
+    }
+})
+
 class ErrorHandler:
     """Centralized error handling and logging"""
     
     @staticmethod
     def log_error(error: Exception, context: Dict[str, Any] = None, account_id: int = None):
         """Log error with context information"""
+        # Only format a traceback when one is actually in flight; outside
+        # an except block format_exc() walks frames just to produce
+        # "NoneType: None". Depth is capped since deep stacks can run to
+        # tens of KB of string
+        tb = error.__traceback__ or sys.exc_info()[2]
+        if tb is not None:
+            formatted_tb = ''.join(
+                traceback.format_exception(type(error), error, tb, limit=20)
+            )
+        else:
+            formatted_tb = None
+
         error_details = {
             "error_type": type(error).__name__,
             "error_message": str(error),
-            "traceback": traceback.format_exc(),
+            "traceback": formatted_tb,
             "context": context or {},
-            "timestamp": datetime.utcnow().isoformat()
+            # Epoch milliseconds: cheaper than ISO formatting per record
+            # and sorts/indexes as a plain int downstream
+            "timestamp": time.time_ns() // 1_000_000
         }
         
         logger.error(f"Error occurred: {error_details}")
         
-        # Log to database if account_id is provided
+        # Buffer for the batching writer if account_id is provided; the
+        # request thread never waits on the DB. When full, the deque
+        # evicts the oldest record (newest errors are the useful ones)
         if account_id:
-            try:
-                db = SessionLocal()
-                activity_log = ActivityLog(
-                    account_id=account_id,
-                    action="error_occurred",
-                    details=error_details
-                )
-                db.add(activity_log)
-                db.commit()
-                db.close()
-            except Exception as db_error:
-                logger.error(f"Failed to log error to database: {db_error}")
+            global _dropped_errors
+            with _error_buf_lock:
+                if len(_error_buf) == _error_buf.maxlen:
+                    _dropped_errors += 1
+                _error_buf.append({
+                    "account_id": account_id,
+                    "action": "error_occurred",
+                    "details": error_details
+                })
+            _error_event.set()
     
     @staticmethod
     def handle_reddit_api_error(error: Exception) -> Dict[str, Any]:
         """Handle Reddit API specific errors"""
-        if isinstance(error, praw.exceptions.RedditAPIException):
-            # Handle specific Reddit API errors
-            error_type = error.error_type if hasattr(error, 'error_type') else 'UNKNOWN'
-            
-            error_responses = {
-                'RATELIMIT': {
-                    "error": "Rate limit exceeded",
-                    "message": "Please wait before making more requests",
-                    "retry_after": getattr(error, 'retry_after', 60)
-                },
-                'INVALID_USER': {
-                    "error": "Invalid user",
-                    "message": "The specified user does not exist"
-                },
-                'SUBREDDIT_NOEXIST': {
-                    "error": "Subreddit does not exist",
-                    "message": "The specified subreddit was not found"
-                },
-                'NO_TEXT': {
-                    "error": "No text provided",
-                    "message": "Text content is required for this action"
-                },
-                'TOO_LONG': {
-                    "error": "Content too long",
-                    "message": "The provided content exceeds the maximum length"
+        praw_exc = _praw_exceptions()
+        if isinstance(error, praw_exc.RedditAPIException):
+            # Handle specific Reddit API errors. EAFP: one attribute
+            # access instead of the hasattr probe plus a second lookup
+            try:
+                error_type = error.error_type
+            except AttributeError:
+                error_type = 'UNKNOWN'
+
+            template = _REDDIT_ERROR_RESPONSES.get(error_type)
+            if template is None:
+                return {
+                    "error": "Reddit API error",
+                    "message": str(error)
                 }
-            }
-            
-            return error_responses.get(error_type, {
-                "error": "Reddit API error",
-                "message": str(error)
-            })
+
+            response = dict(template)
+            if error_type == 'RATELIMIT':
+                try:
+                    response["retry_after"] = error.retry_after
+                except AttributeError:
+                    pass  # Template default of 60 stands
+            return response
         
-        elif isinstance(error, praw.exceptions.ResponseException):
+        elif isinstance(error, praw_exc.ResponseException):
             return {
                 "error": "Reddit response error",
                 "message": f"Reddit API returned status code {error.response.status_code}"
             }
         
-        elif isinstance(error, praw.exceptions.ClientException):
+        elif isinstance(error, praw_exc.ClientException):
             return {
                 "error": "Reddit client error",
                 "message": "Invalid request to Reddit API"
@@ -131,13 +244,14 @@ class ErrorHandler:
         status_code: int,
         error_type: str,
         message: str,
-        details: Dict[str, Any] = None
+        details: Dict[str, Any] = None,
+        timestamp: str = None
     ) -> HTTPException:
         """Create standardized error response"""
         error_detail = {
             "error": error_type,
             "message": message,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": timestamp or datetime.utcnow().isoformat()
         }
         
         if details:
@@ -145,8 +259,13 @@ class ErrorHandler:
         
         return HTTPException(status_code=status_code, detail=error_detail)
 
+# __slots__ keeps the custom exceptions' attributes out of the lazily
+# created instance __dict__, which matters when error storms allocate
+# thousands of them
 class ValidationError(Exception):
     """Custom validation error"""
+    __slots__ = ('message', 'field')
+
     def __init__(self, message: str, field: str = None):
         self.message = message
         self.field = field
@@ -154,6 +273,8 @@ class ValidationError(Exception):
 
 class RateLimitError(Exception):
     """Custom rate limit error"""
+    __slots__ = ('message', 'retry_after')
+
     def __init__(self, message: str, retry_after: int = 60):
         self.message = message
         self.retry_after = retry_after
@@ -161,6 +282,8 @@ class RateLimitError(Exception):
 
 class AuthenticationError(Exception):
     """Custom authentication error"""
+    __slots__ = ('message',)
+
     def __init__(self, message: str):
         self.message = message
         super().__init__(self.message)
@@ -170,23 +293,32 @@ def validate_account_id(account_id: int) -> None:
     if not isinstance(account_id, int) or account_id <= 0:
         raise ValidationError("Invalid account ID", "account_id")
 
+# Allowed subreddit-name characters; a set probe per char beats firing
+# the regex engine on this hot validation path
+_SUBREDDIT_ALLOWED = frozenset(string.ascii_letters + string.digits + '_')
+
 def validate_subreddit_name(subreddit: str) -> None:
     """Validate subreddit name"""
     if not subreddit or not isinstance(subreddit, str):
         raise ValidationError("Invalid subreddit name", "subreddit")
-    
+
     if len(subreddit) > 21:  # Reddit subreddit name limit
         raise ValidationError("Subreddit name too long", "subreddit")
-    
+
     # Basic validation for subreddit name format
-    import re
-    if not re.match(r'^[A-Za-z0-9_]+$', subreddit):
+    if not all(c in _SUBREDDIT_ALLOWED for c in subreddit):
         raise ValidationError("Invalid subreddit name format", "subreddit")
 
+@functools.lru_cache(maxsize=None)
+def _length_error_message(field_name: str, max_length: int) -> str:
+    """Build (once per field/limit pair) the over-length error message"""
+    return f"{field_name} exceeds maximum length of {max_length}"
+
 def validate_content_length(content: str, max_length: int, field_name: str) -> None:
     """Validate content length"""
-    if content and len(content) > max_length:
-        raise ValidationError(f"{field_name} exceeds maximum length of {max_length}", field_name)
+    n = len(content) if content else 0
+    if n > max_length:
+        raise ValidationError(_length_error_message(field_name, max_length), field_name)
 
 def validate_required_field(value: Any, field_name: str) -> None:
     """Validate required field"""
@@ -197,95 +329,190 @@ def validate_required_field(value: Any, field_name: str) -> None:
     if isinstance(value, str) and not value.strip():
         raise ValidationError(f"{field_name} is required", field_name)
 
+# Per-exception-type responders for the global handler
+def _respond_validation_error(exc: ValidationError, ts: str) -> JSONResponse:
+    return ErrorJSONResponse(
+        status_code=400,
+        content={
+            "error": "Validation error",
+            "message": exc.message,
+            "field": exc.field,
+            "timestamp": ts
+        }
+    )
+
+def _respond_rate_limit_error(exc: RateLimitError, ts: str) -> JSONResponse:
+    return ErrorJSONResponse(
+        status_code=429,
+        content={
+            "error": "Rate limit exceeded",
+            "message": exc.message,
+            "retry_after": exc.retry_after,
+            "timestamp": ts
+        }
+    )
+
+def _respond_authentication_error(exc: AuthenticationError, ts: str) -> JSONResponse:
+    return ErrorJSONResponse(
+        status_code=401,
+        content={
+            "error": "Authentication error",
+            "message": exc.message,
+            "timestamp": ts
+        }
+    )
+
+def _respond_reddit_api_error(exc: Exception, ts: str) -> JSONResponse:
+    error_info = ErrorHandler.handle_reddit_api_error(exc)
+    return ErrorJSONResponse(
+        status_code=400,
+        content={
+            **error_info,
+            "timestamp": ts
+        }
+    )
+
+def _respond_database_error(exc: Exception, ts: str) -> JSONResponse:
+    error_info = ErrorHandler.handle_database_error(exc)
+    return ErrorJSONResponse(
+        status_code=500,
+        content={
+            **error_info,
+            "timestamp": ts
+        }
+    )
+
+def _respond_generic_error(exc: Exception, ts: str) -> JSONResponse:
+    return ErrorJSONResponse(
+        status_code=500,
+        content={
+            "error": "Internal server error",
+            "message": "An unexpected error occurred",
+            "timestamp": ts
+        }
+    )
+
+# type(exc) -> responder jump table; the isinstance walk below only runs
+# for subclasses that miss the exact-type lookup
+_EXC_DISPATCH = {
+    ValidationError: _respond_validation_error,
+    RateLimitError: _respond_rate_limit_error,
+    AuthenticationError: _respond_authentication_error,
+    SQLAlchemyError: _respond_database_error,
+}
+
+# Headers worth keeping in error records
+_LOGGED_HEADERS = ("user-agent", "x-request-id", "content-length")
+
+def _make_exception_handler(responder):
+    """Build a FastAPI handler that logs once and delegates to a responder.
+
+    Registering these per exception type lets FastAPI's own type-keyed
+    registry do the dispatch, so each handler only runs its constant-time
+    response work.
+    """
+    async def handler(request: Request, exc: Exception):
+        ts = datetime.utcnow().isoformat()
+        if not getattr(exc, '_logged', False):
+            ErrorHandler.log_error(exc, {
+                "url": str(request.url),
+                "method": request.method,
+                "headers": {
+                    k: request.headers.get(k)
+                    for k in _LOGGED_HEADERS if k in request.headers
+                }
+            })
+        return responder(exc, ts)
+    return handler
+
+validation_error_handler = _make_exception_handler(_respond_validation_error)
+rate_limit_error_handler = _make_exception_handler(_respond_rate_limit_error)
+authentication_error_handler = _make_exception_handler(_respond_authentication_error)
+reddit_api_error_handler = _make_exception_handler(_respond_reddit_api_error)
+database_error_handler = _make_exception_handler(_respond_database_error)
+
 # Global exception handler for FastAPI
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler for FastAPI"""
-    
-    # Log the error
-    ErrorHandler.log_error(exc, {
-        "url": str(request.url),
-        "method": request.method,
-        "headers": dict(request.headers)
-    })
-    
-    # Handle specific error types
-    if isinstance(exc, ValidationError):
-        return JSONResponse(
-            status_code=400,
-            content={
-                "error": "Validation error",
-                "message": exc.message,
-                "field": exc.field,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        )
-    
-    elif isinstance(exc, RateLimitError):
-        return JSONResponse(
-            status_code=429,
-            content={
-                "error": "Rate limit exceeded",
-                "message": exc.message,
-                "retry_after": exc.retry_after,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        )
-    
-    elif isinstance(exc, AuthenticationError):
-        return JSONResponse(
-            status_code=401,
-            content={
-                "error": "Authentication error",
-                "message": exc.message,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        )
-    
-    elif isinstance(exc, praw.exceptions.RedditAPIException):
-        error_info = ErrorHandler.handle_reddit_api_error(exc)
-        return JSONResponse(
-            status_code=400,
-            content={
-                **error_info,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        )
-    
-    elif isinstance(exc, SQLAlchemyError):
-        error_info = ErrorHandler.handle_database_error(exc)
-        return JSONResponse(
-            status_code=500,
-            content={
-                **error_info,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        )
-    
-    else:
-        # Generic error handler
-        return JSONResponse(
-            status_code=500,
-            content={
-                "error": "Internal server error",
-                "message": "An unexpected error occurred",
-                "timestamp": datetime.utcnow().isoformat()
+
+    # One ISO timestamp per invocation for the outbound response; the
+    # internal log record keeps a cheap epoch-ms int instead
+    ts = datetime.utcnow().isoformat()
+
+    # Log the error unless handle_errors already did. Only an allowlist
+    # of headers goes into the record: materializing and JSON-serializing
+    # all of them costs per-error work and can leak auth material into
+    # the logs
+    if not getattr(exc, '_logged', False):
+        ErrorHandler.log_error(exc, {
+            "url": str(request.url),
+            "method": request.method,
+            "headers": {
+                k: request.headers.get(k)
+                for k in _LOGGED_HEADERS if k in request.headers
             }
-        )
+        })
+
+    # O(1) exact-type dispatch with an isinstance fallback for subclasses.
+    # PRAW errors are matched by module name first so praw.exceptions is
+    # only imported once a PRAW error actually occurs
+    responder = _EXC_DISPATCH.get(type(exc))
+    if responder is None:
+        if (type(exc).__module__.startswith('praw')
+                and isinstance(exc, _praw_exceptions().RedditAPIException)):
+            responder = _respond_reddit_api_error
+        else:
+            for exc_type, candidate in _EXC_DISPATCH.items():
+                if isinstance(exc, exc_type):
+                    responder = candidate
+                    break
+            else:
+                responder = _respond_generic_error
+
+    return responder(exc, ts)
+
+# (status_code, error label) per known exception type for handle_errors
+_ERROR_MAP = {
+    ValidationError: (400, "Validation error"),
+    RateLimitError: (429, "Rate limit exceeded"),
+    AuthenticationError: (401, "Authentication error"),
+}
+
+def _error_to_http(e: Exception, func_name: str) -> HTTPException:
+    """Map a caught exception to the standardized HTTPException"""
+    entry = _ERROR_MAP.get(type(e))
+    if entry:
+        return ErrorHandler.create_error_response(entry[0], entry[1], e.message)
+    ErrorHandler.log_error(e, {"function": func_name})
+    # Mark as logged so the global handler doesn't pay a second
+    # log_error for the same exception; builtins without a __dict__
+    # simply stay unmarked
+    try:
+        e._logged = True
+    except AttributeError:
+        pass
+    return ErrorHandler.create_error_response(
+        500, "Internal server error", "An unexpected error occurred"
+    )
 
 # Decorator for endpoint error handling
 def handle_errors(func):
     """Decorator to add error handling to endpoint functions"""
-    def wrapper(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        except ValidationError as e:
-            raise ErrorHandler.create_error_response(400, "Validation error", e.message)
-        except RateLimitError as e:
-            raise ErrorHandler.create_error_response(429, "Rate limit exceeded", e.message)
-        except AuthenticationError as e:
-            raise ErrorHandler.create_error_response(401, "Authentication error", e.message)
-        except Exception as e:
-            ErrorHandler.log_error(e, {"function": func.__name__})
-            raise ErrorHandler.create_error_response(500, "Internal server error", "An unexpected error occurred")
-    
+    # Async endpoints get an async wrapper; a sync wrapper would hand
+    # FastAPI an unawaited coroutine and never catch anything
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                raise _error_to_http(e, func.__name__)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                raise _error_to_http(e, func.__name__)
+
     return wrapper
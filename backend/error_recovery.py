@@ -2,51 +2,74 @@
 Error recovery system for Reddit automation engine
 Provides robust error handling, retry mechanisms, and automatic fallback strategies
 """
+import atexit
 import logging
+import queue
+import re
+import threading
 import time
 import random
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Callable
+from typing import Dict, List, Optional, Any, Callable, Tuple
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum, auto
 import traceback
 
-from celery import current_task
+import redis
+from sqlalchemy import func
+
 from celery_worker import celery_app
 from database import SessionLocal
 from models import (
     RedditAccount, ActivityLog, EngagementLog, AutomationSettings
 )
-from safety_tasks import record_action, is_account_safe
+from safety_tasks import record_action, is_account_safe, redis_client
 
 logger = logging.getLogger(__name__)
 
-class ErrorType(Enum):
-    """Types of errors that can occur"""
-    NETWORK_ERROR = "network_error"
-    API_ERROR = "api_error"
-    RATE_LIMIT_ERROR = "rate_limit_error"
-    AUTHENTICATION_ERROR = "authentication_error"
-    PERMISSION_ERROR = "permission_error"
-    CONTENT_ERROR = "content_error"
-    SHADOWBAN_ERROR = "shadowban_error"
-    UNKNOWN_ERROR = "unknown_error"
-
-class RecoveryStrategy(Enum):
+# Circuit breaker counters live in Redis so the failure threshold is
+# shared across workers and survives restarts
+_CB_KEY_PREFIX = 'cb:'
+_CB_TTL = 3600  # seconds before a breaker decays on its own
+_CB_CACHE_TTL = 1.0  # per-worker read cache, avoids hammering Redis in tight loops
+_SAFE_CACHE_TTL = 5.0  # seconds an is_account_safe verdict stays fresh
+_DEDUP_WINDOW = 10.0  # seconds during which repeat errors coalesce into one row
+
+class ErrorType(IntEnum):
+    """Types of errors that can occur.
+
+    IntEnum so the hot error_patterns/dict lookups hash an int; the
+    stable string form used in keys and stored logs lives in
+    _ERROR_TYPE_LABELS below.
+    """
+    NETWORK_ERROR = auto()
+    API_ERROR = auto()
+    RATE_LIMIT_ERROR = auto()
+    AUTHENTICATION_ERROR = auto()
+    PERMISSION_ERROR = auto()
+    CONTENT_ERROR = auto()
+    SHADOWBAN_ERROR = auto()
+    UNKNOWN_ERROR = auto()
+
+# Matches the old str-Enum values, so circuit keys and the
+# 'error_type' field in stored logs keep their format
+_ERROR_TYPE_LABELS = {error_type: error_type.name.lower() for error_type in ErrorType}
+
+class RecoveryStrategy(IntEnum):
     """Recovery strategies for different error types"""
-    IMMEDIATE_RETRY = "immediate_retry"
-    EXPONENTIAL_BACKOFF = "exponential_backoff"
-    LINEAR_BACKOFF = "linear_backoff"
-    CIRCUIT_BREAKER = "circuit_breaker"
-    FALLBACK_ACTION = "fallback_action"
-    PAUSE_AUTOMATION = "pause_automation"
-    NO_RETRY = "no_retry"
-
-@dataclass
+    IMMEDIATE_RETRY = auto()
+    EXPONENTIAL_BACKOFF = auto()
+    LINEAR_BACKOFF = auto()
+    CIRCUIT_BREAKER = auto()
+    FALLBACK_ACTION = auto()
+    PAUSE_AUTOMATION = auto()
+    NO_RETRY = auto()
+
+@dataclass(frozen=True, slots=True)
 class ErrorPattern:
     """Error pattern configuration"""
     error_type: ErrorType
-    keywords: List[str]
+    keywords: Tuple[str, ...]
     strategy: RecoveryStrategy
     max_retries: int
     base_delay: int  # seconds
@@ -55,12 +78,19 @@ class ErrorPattern:
 
 class ErrorRecoverySystem:
     """Comprehensive error recovery system"""
-    
+
+    # Status codes resolve in O(1); anything >= 500 maps to API_ERROR
+    _STATUS_MAP = {
+        429: ErrorType.RATE_LIMIT_ERROR,
+        401: ErrorType.AUTHENTICATION_ERROR,
+        403: ErrorType.PERMISSION_ERROR,
+    }
+
     def __init__(self):
         self.error_patterns = {
             ErrorType.NETWORK_ERROR: ErrorPattern(
                 error_type=ErrorType.NETWORK_ERROR,
-                keywords=['connection', 'timeout', 'network', 'unreachable', 'dns'],
+                keywords=('connection', 'timeout', 'network', 'unreachable', 'dns'),
                 strategy=RecoveryStrategy.EXPONENTIAL_BACKOFF,
                 max_retries=5,
                 base_delay=30,
@@ -68,7 +98,7 @@ class ErrorRecoverySystem:
             ),
             ErrorType.API_ERROR: ErrorPattern(
                 error_type=ErrorType.API_ERROR,
-                keywords=['api', 'server error', '500', '502', '503', '504'],
+                keywords=('api', 'server error', '500', '502', '503', '504'),
                 strategy=RecoveryStrategy.EXPONENTIAL_BACKOFF,
                 max_retries=3,
                 base_delay=60,
@@ -76,7 +106,7 @@ class ErrorRecoverySystem:
             ),
             ErrorType.RATE_LIMIT_ERROR: ErrorPattern(
                 error_type=ErrorType.RATE_LIMIT_ERROR,
-                keywords=['rate limit', 'too many requests', '429', 'quota'],
+                keywords=('rate limit', 'too many requests', '429', 'quota'),
                 strategy=RecoveryStrategy.LINEAR_BACKOFF,
                 max_retries=2,
                 base_delay=300,
@@ -84,7 +114,7 @@ class ErrorRecoverySystem:
             ),
             ErrorType.AUTHENTICATION_ERROR: ErrorPattern(
                 error_type=ErrorType.AUTHENTICATION_ERROR,
-                keywords=['unauthorized', '401', 'authentication', 'invalid token', 'expired'],
+                keywords=('unauthorized', '401', 'authentication', 'invalid token', 'expired'),
                 strategy=RecoveryStrategy.PAUSE_AUTOMATION,
                 max_retries=1,
                 base_delay=3600,
@@ -92,7 +122,7 @@ class ErrorRecoverySystem:
             ),
             ErrorType.PERMISSION_ERROR: ErrorPattern(
                 error_type=ErrorType.PERMISSION_ERROR,
-                keywords=['forbidden', '403', 'permission', 'banned', 'suspended'],
+                keywords=('forbidden', '403', 'permission', 'banned', 'suspended'),
                 strategy=RecoveryStrategy.PAUSE_AUTOMATION,
                 max_retries=0,
                 base_delay=0,
@@ -100,7 +130,7 @@ class ErrorRecoverySystem:
             ),
             ErrorType.SHADOWBAN_ERROR: ErrorPattern(
                 error_type=ErrorType.SHADOWBAN_ERROR,
-                keywords=['shadowban', 'shadow ban', 'invisible', 'not visible'],
+                keywords=('shadowban', 'shadow ban', 'invisible', 'not visible'),
                 strategy=RecoveryStrategy.PAUSE_AUTOMATION,
                 max_retries=0,
                 base_delay=0,
@@ -108,7 +138,7 @@ class ErrorRecoverySystem:
             ),
             ErrorType.CONTENT_ERROR: ErrorPattern(
                 error_type=ErrorType.CONTENT_ERROR,
-                keywords=['content', 'spam', 'duplicate', 'removed', 'deleted'],
+                keywords=('content', 'spam', 'duplicate', 'removed', 'deleted'),
                 strategy=RecoveryStrategy.FALLBACK_ACTION,
                 max_retries=2,
                 base_delay=60,
@@ -116,30 +146,102 @@ class ErrorRecoverySystem:
             )
         }
         
-        self.circuit_breakers = {}  # Track circuit breaker states
-        
+        # Per-worker mirror of the Redis counters: feeds reports and acts
+        # as a degraded-mode fallback when Redis is unreachable
+        self.circuit_breakers = {}
+        self._cb_cache = {}  # circuit_key -> (count, expires_at)
+        self._last_delay = {}  # (account_id, error_type) -> last backoff used
+        self._safe_cache = {}  # account_id -> (is_safe, expires_at)
+        self._active_types = {}  # account_id -> set of ErrorTypes this worker tripped
+        self._recent = {}  # (account_id, error_type) -> (window_start, suppressed)
+
+        # One combined regex scans the message once instead of a Python
+        # loop over patterns x keywords per classification. The lookahead
+        # makes matches zero-width so overlapping keywords (e.g.
+        # 'shadow ban' and 'banned') are all reported, and alternatives
+        # are listed in pattern declaration order so ties at the same
+        # position resolve exactly as the old per-pattern loop did.
+        self._keyword_rank = {}
+        for rank, (error_type, pattern) in enumerate(self.error_patterns.items()):
+            for keyword in pattern.keywords:
+                self._keyword_rank.setdefault(keyword, (rank, error_type))
+        self._keyword_re = re.compile(
+            '(?=(' + '|'.join(re.escape(kw) for kw in self._keyword_rank) + '))'
+        )
+
+        # Error logs are written by a background thread in batches so the
+        # failure hot path never waits on a commit; see _drain_error_queue
+        self._error_queue: queue.Queue = queue.Queue()
+        self._error_writer = threading.Thread(
+            target=self._drain_error_queue, daemon=True, name='error-log-writer'
+        )
+        self._error_writer.start()
+        atexit.register(self._flush_error_queue)
+
+    _ERROR_BATCH_SIZE = 100
+
+    def _drain_error_queue(self) -> None:
+        """Persist queued error logs in batches from a single thread"""
+        db = SessionLocal()
+        while True:
+            batch = [self._error_queue.get()]
+            try:
+                while len(batch) < self._ERROR_BATCH_SIZE:
+                    batch.append(self._error_queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                db.bulk_insert_mappings(ActivityLog, batch)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error flushing {len(batch)} error logs: {e}")
+
+    def _flush_error_queue(self) -> None:
+        """Best-effort synchronous flush of pending error logs at exit"""
+        batch = []
+        try:
+            while True:
+                batch.append(self._error_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if not batch:
+            return
+        try:
+            db = SessionLocal()
+            db.bulk_insert_mappings(ActivityLog, batch)
+            db.commit()
+            db.close()
+        except Exception as e:
+            logger.error(f"Error flushing error logs at exit: {e}")
+
     def classify_error(self, error_message: str, error_details: Dict[str, Any] = None) -> ErrorType:
         """Classify error based on message and details"""
-        error_message_lower = error_message.lower()
-        
-        # Check each error pattern
-        for error_type, pattern in self.error_patterns.items():
-            if any(keyword in error_message_lower for keyword in pattern.keywords):
-                return error_type
-        
-        # Check HTTP status codes if available
+        # An HTTP status code is authoritative and resolves without any
+        # string scanning — the common Reddit API 429/401/403/5xx case
         if error_details:
             status_code = error_details.get('status_code')
             if status_code:
-                if status_code == 429:
-                    return ErrorType.RATE_LIMIT_ERROR
-                elif status_code == 401:
-                    return ErrorType.AUTHENTICATION_ERROR
-                elif status_code == 403:
-                    return ErrorType.PERMISSION_ERROR
-                elif status_code >= 500:
+                mapped = self._STATUS_MAP.get(status_code)
+                if mapped is not None:
+                    return mapped
+                if status_code >= 500:
                     return ErrorType.API_ERROR
-        
+
+        error_message_lower = error_message.lower()
+
+        # Single linear pass; keep the match from the earliest-declared
+        # pattern to preserve the old per-pattern check order
+        best = None
+        for match in self._keyword_re.finditer(error_message_lower):
+            rank, error_type = self._keyword_rank[match.group(1)]
+            if best is None or rank < best[0]:
+                best = (rank, error_type)
+                if rank == 0:
+                    break
+        if best is not None:
+            return best[1]
+
         return ErrorType.UNKNOWN_ERROR
     
     def should_retry(self, account_id: int, error_type: ErrorType, attempt: int) -> bool:
@@ -154,83 +256,166 @@ class ErrorRecoverySystem:
         
         # Check circuit breaker
         if pattern.strategy == RecoveryStrategy.CIRCUIT_BREAKER:
-            circuit_key = f"{account_id}:{error_type.value}"
-            if self.circuit_breakers.get(circuit_key, 0) >= pattern.circuit_breaker_threshold:
+            circuit_key = f"{account_id}:{_ERROR_TYPE_LABELS[error_type]}"
+            if self._circuit_breaker_count(circuit_key) >= pattern.circuit_breaker_threshold:
                 logger.warning(f"Circuit breaker open for {circuit_key}")
                 return False
         
         # Check if account is still safe
-        if not is_account_safe(account_id):
+        if not self._is_account_safe_cached(account_id):
             logger.warning(f"Account {account_id} not safe, skipping retry")
             return False
         
         return True
     
-    def calculate_delay(self, error_type: ErrorType, attempt: int) -> int:
-        """Calculate delay before retry"""
+    def calculate_delay(self, error_type: ErrorType, attempt: int,
+                        account_id: int = None) -> int:
+        """Calculate delay before retry.
+
+        Exponential backoff uses AWS-style decorrelated jitter
+        (uniform between base and 3x the previous delay) and linear
+        backoff uses full jitter; a narrow +/-20% band is not enough to
+        de-synchronize a fleet of workers retrying the same failure.
+        """
         pattern = self.error_patterns.get(error_type)
         if not pattern:
             return 60  # Default 1 minute
-        
+
         if pattern.strategy == RecoveryStrategy.IMMEDIATE_RETRY:
             return 0
         elif pattern.strategy == RecoveryStrategy.EXPONENTIAL_BACKOFF:
-            delay = pattern.base_delay * (2 ** attempt)
+            key = (account_id, error_type)
+            prev = self._last_delay.get(key, pattern.base_delay)
+            delay = random.uniform(pattern.base_delay,
+                                   min(pattern.max_delay, prev * 3))
+            self._last_delay[key] = delay
         elif pattern.strategy == RecoveryStrategy.LINEAR_BACKOFF:
-            delay = pattern.base_delay * (attempt + 1)
+            delay = random.uniform(0, pattern.base_delay * (attempt + 1))
         else:
             delay = pattern.base_delay
-        
-        # Add jitter to avoid thundering herd
-        jitter = random.uniform(0.8, 1.2)
-        delay = int(delay * jitter)
-        
+
         # Cap at max delay
-        return min(delay, pattern.max_delay)
+        return min(int(delay), pattern.max_delay)
     
     def record_error(self, account_id: int, action_type: str, error_type: ErrorType, 
                     error_message: str, error_details: Dict[str, Any] = None) -> None:
         """Record error for analysis and circuit breaker logic"""
         try:
-            # Update circuit breaker counter
-            circuit_key = f"{account_id}:{error_type.value}"
-            self.circuit_breakers[circuit_key] = self.circuit_breakers.get(circuit_key, 0) + 1
-            
+            # Update circuit breaker counter atomically in Redis so the
+            # threshold holds fleet-wide, not per worker
+            circuit_key = f"{account_id}:{_ERROR_TYPE_LABELS[error_type]}"
+            try:
+                pipe = redis_client.pipeline()
+                pipe.incr(_CB_KEY_PREFIX + circuit_key)
+                pipe.expire(_CB_KEY_PREFIX + circuit_key, _CB_TTL)
+                count = pipe.execute()[0]
+            except redis.RedisError:
+                count = self.circuit_breakers.get(circuit_key, 0) + 1
+            self.circuit_breakers[circuit_key] = count
+            self._cb_cache.pop(circuit_key, None)
+            self._active_types.setdefault(account_id, set()).add(error_type)
+
+
             # Record action as failed
             record_action(account_id, action_type, success=False)
-            
-            # Log error to database
-            db = SessionLocal()
-            error_log = ActivityLog(
-                account_id=account_id,
-                action='error_recorded',
-                details={
-                    'action_type': action_type,
-                    'error_type': error_type.value,
-                    'error_message': error_message,
-                    'error_details': error_details or {},
-                    'circuit_breaker_count': self.circuit_breakers[circuit_key],
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-            )
-            db.add(error_log)
-            db.commit()
-            db.close()
-            
-            logger.error(f"Error recorded for account {account_id}: {error_type.value} - {error_message}")
-            
+
+            # During an outage the same (account, error type) can fail
+            # thousands of times in seconds — exactly when the DB is
+            # least able to log it. Coalesce repeats within the window
+            # into the next row's suppressed_duplicates count; the
+            # breaker counters above stay exact
+            dedup_key = (account_id, error_type)
+            now = time.monotonic()
+            recent = self._recent.get(dedup_key)
+            if recent and now - recent[0] < _DEDUP_WINDOW:
+                self._recent[dedup_key] = (recent[0], recent[1] + 1)
+                logger.error(f"Error recorded for account {account_id}: {_ERROR_TYPE_LABELS[error_type]} - {error_message} (log coalesced)")
+                return
+            suppressed = recent[1] if recent else 0
+            self._recent[dedup_key] = (now, 0)
+
+            # Enqueue for the background writer — no DB I/O on the hot
+            # path. action_type/error_type go into real columns; the
+            # JSON details keep only the free-form payload
+            details = {
+                'error_message': error_message,
+                'error_details': error_details or {},
+                'circuit_breaker_count': self.circuit_breakers[circuit_key],
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            if suppressed:
+                details['suppressed_duplicates'] = suppressed
+            self._error_queue.put_nowait({
+                'account_id': account_id,
+                'timestamp': datetime.utcnow(),
+                'action': 'error_recorded',
+                'action_type': action_type,
+                'error_type': _ERROR_TYPE_LABELS[error_type],
+                'details': details
+            })
+
+            logger.error(f"Error recorded for account {account_id}: {_ERROR_TYPE_LABELS[error_type]} - {error_message}")
+
         except Exception as e:
             logger.error(f"Error recording error: {e}")
-            if 'db' in locals():
-                db.rollback()
-                db.close()
     
+    def _is_account_safe_cached(self, account_id: int) -> bool:
+        """is_account_safe with a short TTL, for bursty retry decisions"""
+        now = time.monotonic()
+        cached = self._safe_cache.get(account_id)
+        if cached and cached[1] > now:
+            return cached[0]
+        safe = is_account_safe(account_id)
+        self._safe_cache[account_id] = (safe, now + _SAFE_CACHE_TTL)
+        return safe
+
+    def _circuit_breaker_count(self, circuit_key: str) -> int:
+        """Current shared failure count, with a short local read cache"""
+        now = time.monotonic()
+        cached = self._cb_cache.get(circuit_key)
+        if cached and cached[1] > now:
+            return cached[0]
+        try:
+            count = int(redis_client.get(_CB_KEY_PREFIX + circuit_key) or 0)
+            if count:
+                self.circuit_breakers[circuit_key] = count
+            else:
+                self.circuit_breakers.pop(circuit_key, None)
+        except redis.RedisError:
+            count = self.circuit_breakers.get(circuit_key, 0)
+        self._cb_cache[circuit_key] = (count, now + _CB_CACHE_TTL)
+        return count
+
     def reset_circuit_breaker(self, account_id: int, error_type: ErrorType) -> None:
         """Reset circuit breaker after successful operation"""
-        circuit_key = f"{account_id}:{error_type.value}"
+        circuit_key = f"{account_id}:{_ERROR_TYPE_LABELS[error_type]}"
+        try:
+            redis_client.delete(_CB_KEY_PREFIX + circuit_key)
+        except redis.RedisError:
+            pass
+        self._cb_cache.pop(circuit_key, None)
+        active = self._active_types.get(account_id)
+        if active:
+            active.discard(error_type)
         if circuit_key in self.circuit_breakers:
             del self.circuit_breakers[circuit_key]
             logger.info(f"Circuit breaker reset for {circuit_key}")
+
+    def reset_account_circuit_breakers(self, account_id: int) -> None:
+        """Clear every breaker for an account in one round trip"""
+        keys = [f"{account_id}:{label}" for label in _ERROR_TYPE_LABELS.values()]
+        try:
+            redis_client.unlink(*(_CB_KEY_PREFIX + key for key in keys))
+        except redis.RedisError:
+            pass
+        for key in keys:
+            self._cb_cache.pop(key, None)
+            self.circuit_breakers.pop(key, None)
+        for error_type in ErrorType:
+            self._last_delay.pop((account_id, error_type), None)
+        # A successful action is fresh evidence; drop any cached verdict
+        self._safe_cache.pop(account_id, None)
+        self._active_types.pop(account_id, None)
     
     def get_fallback_action(self, original_action: str, error_type: ErrorType) -> Optional[str]:
         """Get fallback action for failed operation"""
@@ -251,35 +436,44 @@ def with_error_recovery(action_type: str):
     """Decorator for adding error recovery to automation tasks"""
     def decorator(func: Callable) -> Callable:
         def wrapper(self, account_id: int, *args, **kwargs):
-            attempt = getattr(self.request, 'retries', 0)
+            attempt = self.request.retries
             
             try:
                 # Execute the original function
                 result = func(self, account_id, *args, **kwargs)
                 
-                # If successful, reset any circuit breakers
-                for error_type in ErrorType:
-                    error_recovery.reset_circuit_breaker(account_id, error_type)
+                # If successful, reset circuit breakers — but only when
+                # this worker actually tripped one, so the happy path
+                # costs a single dict lookup and no Redis traffic
+                if account_id in error_recovery._active_types:
+                    error_recovery.reset_account_circuit_breakers(account_id)
                 
                 return result
                 
             except Exception as e:
                 error_message = str(e)
+
+                # Classify the error
+                error_type = error_recovery.classify_error(error_message)
+
+                # The stored payload is debugging aid only: truncate the
+                # call args, and skip the traceback entirely for expected
+                # errors (rate limits, expired credentials) where the
+                # stack adds nothing but formatting cost
                 error_details = {
-                    'traceback': traceback.format_exc(),
-                    'args': args,
-                    'kwargs': kwargs
+                    'args_repr': repr(args)[:512],
+                    'kwargs_repr': repr(kwargs)[:512]
                 }
-                
-                # Classify the error
-                error_type = error_recovery.classify_error(error_message, error_details)
-                
+                if error_type not in (ErrorType.RATE_LIMIT_ERROR,
+                                      ErrorType.AUTHENTICATION_ERROR):
+                    error_details['traceback'] = traceback.format_exc(limit=10)[-2048:]
+
                 # Record the error
                 error_recovery.record_error(account_id, action_type, error_type, error_message, error_details)
                 
                 # Determine if we should retry
                 if error_recovery.should_retry(account_id, error_type, attempt):
-                    delay = error_recovery.calculate_delay(error_type, attempt)
+                    delay = error_recovery.calculate_delay(error_type, attempt, account_id)
                     logger.info(f"Retrying {action_type} for account {account_id} in {delay} seconds (attempt {attempt + 1})")
                     raise self.retry(countdown=delay)
                 
@@ -294,14 +488,14 @@ def with_error_recovery(action_type: str):
                             'status': 'fallback_attempted',
                             'original_action': action_type,
                             'fallback_action': fallback_action,
-                            'error_type': error_type.value,
+                            'error_type': _ERROR_TYPE_LABELS[error_type],
                             'error_message': error_message
                         }
                 
                 # If we can't retry or fallback, return error
                 return {
                     'status': 'error',
-                    'error_type': error_type.value,
+                    'error_type': _ERROR_TYPE_LABELS[error_type],
                     'error_message': error_message,
                     'attempt': attempt,
                     'max_retries_reached': True
@@ -312,53 +506,43 @@ def with_error_recovery(action_type: str):
 
 # Celery Tasks for Error Recovery Management
 
-@celery_app.task(bind=True, max_retries=3)
-def analyze_error_patterns(self, account_id: int = None, days: int = 7) -> Dict[str, Any]:
-    """Analyze error patterns to improve recovery strategies"""
+def _analyze_error_patterns_impl(account_id: int = None, days: int = 7) -> Dict[str, Any]:
+    """Shared implementation so in-process callers skip the broker"""
     try:
         logger.info(f"Analyzing error patterns for {'all accounts' if not account_id else f'account {account_id}'}")
 
         db = SessionLocal()
 
-        # Get error logs
+        # Aggregate in the database: three GROUP BY queries return a few
+        # rows each instead of hydrating every error log into Python
         start_date = datetime.utcnow() - timedelta(days=days)
-        query = db.query(ActivityLog).filter(
+        filters = [
             ActivityLog.action == 'error_recorded',
             ActivityLog.timestamp >= start_date
-        )
+        ]
 
         if account_id:
-            query = query.filter(ActivityLog.account_id == account_id)
+            filters.append(ActivityLog.account_id == account_id)
 
-        error_logs = query.all()
+        total_errors = db.query(func.count(ActivityLog.id)).filter(*filters).scalar() or 0
+
+        by_type = db.query(ActivityLog.error_type, func.count()).filter(
+            *filters).group_by(ActivityLog.error_type).all()
+        by_account = db.query(ActivityLog.account_id, func.count()).filter(
+            *filters).group_by(ActivityLog.account_id).all()
+        by_action = db.query(ActivityLog.action_type, func.count()).filter(
+            *filters).group_by(ActivityLog.action_type).all()
 
         analysis = {
             'analysis_period_days': days,
-            'total_errors': len(error_logs),
-            'error_by_type': {},
-            'error_by_account': {},
-            'error_by_action': {},
+            'total_errors': total_errors,
+            'error_by_type': {(etype or 'unknown'): count for etype, count in by_type},
+            'error_by_account': dict(by_account),
+            'error_by_action': {(atype or 'unknown'): count for atype, count in by_action},
             'recovery_effectiveness': {},
             'recommendations': []
         }
 
-        for log in error_logs:
-            if not log.details or not isinstance(log.details, dict):
-                continue
-
-            error_type = log.details.get('error_type', 'unknown')
-            action_type = log.details.get('action_type', 'unknown')
-            account_id_log = log.account_id
-
-            # Count by error type
-            analysis['error_by_type'][error_type] = analysis['error_by_type'].get(error_type, 0) + 1
-
-            # Count by account
-            analysis['error_by_account'][account_id_log] = analysis['error_by_account'].get(account_id_log, 0) + 1
-
-            # Count by action
-            analysis['error_by_action'][action_type] = analysis['error_by_action'].get(action_type, 0) + 1
-
         # Generate recommendations
         if analysis['error_by_type']:
             most_common_error = max(analysis['error_by_type'], key=analysis['error_by_type'].get)
@@ -393,10 +577,18 @@ def analyze_error_patterns(self, account_id: int = None, days: int = 7) -> Dict[
             'analysis': analysis
         }
 
-    except Exception as e:
-        logger.error(f"Error analyzing error patterns: {e}")
+    except Exception:
         if 'db' in locals():
             db.close()
+        raise
+
+@celery_app.task(bind=True, max_retries=3, ignore_result=False)
+def analyze_error_patterns(self, account_id: int = None, days: int = 7) -> Dict[str, Any]:
+    """Analyze error patterns to improve recovery strategies"""
+    try:
+        return _analyze_error_patterns_impl(account_id=account_id, days=days)
+    except Exception as e:
+        logger.error(f"Error analyzing error patterns: {e}")
 
         if self.request.retries < self.max_retries:
             raise self.retry(countdown=300)
@@ -413,14 +605,19 @@ def reset_circuit_breakers(account_id: int = None) -> Dict[str, Any]:
 
         if account_id:
             # Reset for specific account
-            keys_to_remove = [key for key in error_recovery.circuit_breakers.keys() if key.startswith(f"{account_id}:")]
-            for key in keys_to_remove:
-                del error_recovery.circuit_breakers[key]
-                reset_count += 1
+            error_recovery.reset_account_circuit_breakers(account_id)
+            reset_count = len(ErrorType)
         else:
-            # Reset all circuit breakers
-            reset_count = len(error_recovery.circuit_breakers)
+            # Reset all circuit breakers, including those held for other
+            # workers in Redis
+            try:
+                keys = list(redis_client.scan_iter(match=_CB_KEY_PREFIX + '*', count=500))
+                if keys:
+                    reset_count = redis_client.unlink(*keys)
+            except redis.RedisError:
+                reset_count = len(error_recovery.circuit_breakers)
             error_recovery.circuit_breakers.clear()
+            error_recovery._cb_cache.clear()
 
         logger.info(f"Reset {reset_count} circuit breakers")
 
@@ -443,16 +640,11 @@ def cleanup_error_logs(days_to_keep: int = 30) -> Dict[str, Any]:
         db = SessionLocal()
         cutoff_date = datetime.utcnow() - timedelta(days=days_to_keep)
 
-        # Count and delete old error logs
+        # One DELETE; rowcount replaces the separate COUNT(*) pre-scan
         deleted_count = db.query(ActivityLog).filter(
             ActivityLog.action == 'error_recorded',
             ActivityLog.timestamp < cutoff_date
-        ).count()
-
-        db.query(ActivityLog).filter(
-            ActivityLog.action == 'error_recorded',
-            ActivityLog.timestamp < cutoff_date
-        ).delete()
+        ).delete(synchronize_session=False)
 
         db.commit()
         db.close()
@@ -478,9 +670,10 @@ def generate_error_recovery_report(days: int = 7) -> Dict[str, Any]:
     try:
         logger.info(f"Generating error recovery report for last {days} days")
 
-        # Get error analysis
-        analysis_result = analyze_error_patterns.delay(days=days)
-        analysis = analysis_result.get(timeout=60)
+        # Get error analysis in-process: queueing the analysis task and
+        # blocking on its result would cost a broker round trip and can
+        # deadlock when every worker is busy
+        analysis = _analyze_error_patterns_impl(days=days)
 
         if analysis['status'] != 'success':
             return analysis
@@ -5,49 +5,180 @@ Provides data export functionality in various formats (CSV, JSON, PDF)
 import csv
 import json
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 from io import StringIO, BytesIO
 import tempfile
 import os
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional C encoder
+    orjson = None
+
+try:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen.canvas import Canvas
+except ImportError:  # pragma: no cover - optional PDF backend
+    Canvas = None
+
+from sqlalchemy import func
+
 from analytics_engine import analytics_engine
-from database import SessionLocal
-from models import RedditAccount
+from database import read_only_session
+from models import RedditAccount, EngagementLog
 
 logger = logging.getLogger(__name__)
 
+# Usernames effectively never change; cache them so each export costs
+# one account lookup per TTL instead of one per call
+_USERNAME_CACHE_TTL = 300  # seconds
+_username_cache = {}  # account_id -> (username, expires_at)
+
+# Read-aside cache for full analytics exports: dashboards re-request the
+# same (account, format, days) within minutes. Entries carry the latest
+# engagement timestamp as a dirty bit so new activity bypasses the cache
+_EXPORT_CACHE_TTL = 60  # seconds
+_export_cache = {}  # (account_id, format, days) -> (result, expires_at, data_version)
+_export_cache_lock = threading.Lock()
+
+# Log exports at or below the threshold are encoded in one call; larger
+# ones are encoded compactly in chunks of rows so peak allocation stays
+# at one chunk instead of the whole document
+_JSON_STREAM_THRESHOLD = 500  # rows
+_JSON_STREAM_CHUNK = 1000  # rows per dumps call
+
+def _dumps_compact(obj: Any) -> str:
+    """Compact JSON string for embedding in CSV cells"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj)
+
+def _dumps_compact_bytes(obj: Any) -> bytes:
+    """Compact JSON bytes for chunked streaming encodes"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, default=str).encode('utf-8')
+
 class ExportService:
     """Service for exporting analytics data in various formats"""
     
     def __init__(self):
-        self.supported_formats = ['json', 'csv', 'pdf']
-    
+        # frozenset gives O(1) membership checks on the request path
+        self.supported_formats = frozenset(('json', 'csv', 'pdf'))
+        self._format_handlers = {
+            'json': self._export_json,
+            'csv': self._export_csv,
+            'pdf': self._export_pdf,
+        }
+
+    def invalidate(self, account_id: int) -> None:
+        """Drop cached exports for an account after writes elsewhere"""
+        with _export_cache_lock:
+            for key in [k for k in _export_cache if k[0] == account_id]:
+                del _export_cache[key]
+
+    def _account_username(self, db, account_id: int) -> Optional[str]:
+        """Username for an account, cached; None when the account is missing"""
+        now = time.monotonic()
+        cached = _username_cache.get(account_id)
+        if cached and cached[1] > now:
+            return cached[0]
+        username = db.query(RedditAccount.reddit_username).filter(
+            RedditAccount.id == account_id
+        ).scalar()
+        if username is not None:
+            _username_cache[account_id] = (username, now + _USERNAME_CACHE_TTL)
+        return username
+
+    def _encode_json(self, data: Dict[str, Any]) -> bytes:
+        """Incrementally encode to bytes instead of one giant string.
+
+        orjson's C encoder returns bytes directly and is roughly an
+        order of magnitude faster than the stdlib on these numeric-heavy
+        payloads; without it, iterencode writes the payload chunk by
+        chunk into the buffer, so peak memory is one buffer rather than
+        string + encoded copy.
+        """
+        if orjson is not None:
+            return orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2)
+        buf = BytesIO()
+        encoder = json.JSONEncoder(indent=2, default=str, ensure_ascii=False)
+        for chunk in encoder.iterencode(data):
+            buf.write(chunk.encode('utf-8'))
+        return buf.getvalue()
+
+    def _encode_json_rows(self, export_info: Dict[str, Any], key: str,
+                          rows: List[Dict[str, Any]]) -> bytes:
+        """Encode a row-list export, streaming when it is large.
+
+        Small exports keep the indented format via _encode_json. Past
+        the threshold the document is framed by hand and the rows are
+        encoded compactly one chunk at a time, so the encoder never
+        holds more than one chunk's worth of output.
+        """
+        if len(rows) <= _JSON_STREAM_THRESHOLD:
+            return self._encode_json({'export_info': export_info, key: rows})
+        buf = BytesIO()
+        buf.write(b'{"export_info":')
+        buf.write(_dumps_compact_bytes(export_info))
+        buf.write(b',"' + key.encode('utf-8') + b'":[')
+        for start in range(0, len(rows), _JSON_STREAM_CHUNK):
+            if start:
+                buf.write(b',')
+            # strip the chunk's own [ ] so the chunks join into one array
+            buf.write(_dumps_compact_bytes(rows[start:start + _JSON_STREAM_CHUNK])[1:-1])
+        buf.write(b']}')
+        return buf.getvalue()
+
     def export_account_analytics(self, account_id: int, format: str = 'json', days: int = 30) -> Dict[str, Any]:
         """Export comprehensive analytics for an account"""
         try:
             if format not in self.supported_formats:
                 raise ValueError(f"Unsupported format: {format}")
+
+            # Serve repeats from the cache when no engagement has been
+            # logged since the entry was built
+            cache_key = (account_id, format, days)
+            with read_only_session() as db:
+                data_version = db.query(func.max(EngagementLog.timestamp)).filter(
+                    EngagementLog.account_id == account_id
+                ).scalar()
+            with _export_cache_lock:
+                entry = _export_cache.get(cache_key)
+            if entry and entry[1] > time.monotonic() and entry[2] == data_version:
+                return entry[0]
+
+            # Gather all analytics data. The four computations are
+            # independent and DB-bound, so fan them out: wall time is
+            # the slowest query instead of the sum of all four. Each
+            # worker thread gets its own session via the scoped
+            # SessionLocal.
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                karma_future = pool.submit(analytics_engine.get_karma_growth_analytics, account_id, days)
+                engagement_future = pool.submit(analytics_engine.get_engagement_analytics, account_id, days)
+                performance_future = pool.submit(analytics_engine.get_performance_analytics, account_id, days)
+                subreddit_future = pool.submit(analytics_engine.get_subreddit_analytics, account_id, days)
+            karma_metrics = karma_future.result()
+            engagement_metrics = engagement_future.result()
+            performance_metrics = performance_future.result()
+            subreddit_analytics = subreddit_future.result()
             
-            # Gather all analytics data
-            karma_metrics = analytics_engine.get_karma_growth_analytics(account_id, days)
-            engagement_metrics = analytics_engine.get_engagement_analytics(account_id, days)
-            performance_metrics = analytics_engine.get_performance_analytics(account_id, days)
-            subreddit_analytics = analytics_engine.get_subreddit_analytics(account_id, days)
-            
-            # Get account info
-            db = SessionLocal()
-            account = db.query(RedditAccount).filter(RedditAccount.id == account_id).first()
-            db.close()
-            
-            if not account:
+            # Get account info (cached username, not the full row)
+            with read_only_session() as db:
+                username = self._account_username(db, account_id)
+
+            if username is None:
                 raise ValueError(f"Account {account_id} not found")
-            
+
             # Prepare export data
             export_data = {
                 'export_info': {
                     'account_id': account_id,
-                    'username': account.reddit_username,
+                    'username': username,
                     'export_date': datetime.utcnow().isoformat(),
                     'period_days': days,
                     'format': format
@@ -84,12 +215,13 @@ class ExportService:
             }
             
             # Export in requested format
-            if format == 'json':
-                return self._export_json(export_data, account.reddit_username, days)
-            elif format == 'csv':
-                return self._export_csv(export_data, account.reddit_username, days)
-            elif format == 'pdf':
-                return self._export_pdf(export_data, account.reddit_username, days)
+            result = self._format_handlers[format](export_data, username, days)
+
+            with _export_cache_lock:
+                _export_cache[cache_key] = (
+                    result, time.monotonic() + _EXPORT_CACHE_TTL, data_version
+                )
+            return result
             
         except Exception as e:
             logger.error(f"Error exporting account analytics: {e}")
@@ -98,15 +230,15 @@ class ExportService:
     def _export_json(self, data: Dict[str, Any], username: str, days: int) -> Dict[str, Any]:
         """Export data as JSON"""
         try:
-            json_content = json.dumps(data, indent=2, default=str)
+            json_bytes = self._encode_json(data)
             filename = f"reddit_analytics_{username}_{days}days_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
-            
+
             return {
                 'format': 'json',
                 'filename': filename,
-                'content': json_content,
+                'content': json_bytes,
                 'content_type': 'application/json',
-                'size': len(json_content.encode('utf-8'))
+                'size': len(json_bytes)
             }
             
         except Exception as e:
@@ -116,77 +248,81 @@ class ExportService:
     def _export_csv(self, data: Dict[str, Any], username: str, days: int) -> Dict[str, Any]:
         """Export data as CSV"""
         try:
-            output = StringIO()
-            
+            output = StringIO(newline='')
+
             # Write summary information
             output.write("Reddit Analytics Export\n")
             output.write(f"Account: {data['export_info']['username']}\n")
             output.write(f"Period: {data['export_info']['period_days']} days\n")
             output.write(f"Export Date: {data['export_info']['export_date']}\n")
             output.write("\n")
-            
+
+            # One writer for every section; rows are built as lists and
+            # flushed with writerows to avoid per-row writer overhead
+            writer = csv.writer(output)
+
             # Karma Analytics
             output.write("KARMA ANALYTICS\n")
-            karma_writer = csv.writer(output)
-            karma_writer.writerow(['Metric', 'Value'])
+            writer.writerow(['Metric', 'Value'])
             karma_data = data['karma_analytics']
-            for key, value in karma_data.items():
-                karma_writer.writerow([key.replace('_', ' ').title(), value])
+            writer.writerows(
+                (key.replace('_', ' ').title(), value)
+                for key, value in karma_data.items()
+            )
             output.write("\n")
-            
-            # Engagement Analytics
+
+            # Engagement Analytics; dict values flatten to "key - subkey"
             output.write("ENGAGEMENT ANALYTICS\n")
-            engagement_writer = csv.writer(output)
-            engagement_writer.writerow(['Metric', 'Value'])
+            writer.writerow(['Metric', 'Value'])
             engagement_data = data['engagement_analytics']
+            engagement_rows = []
             for key, value in engagement_data.items():
                 if isinstance(value, dict):
-                    for sub_key, sub_value in value.items():
-                        engagement_writer.writerow([f"{key} - {sub_key}", sub_value])
+                    engagement_rows.extend(
+                        (f"{key} - {sub_key}", sub_value)
+                        for sub_key, sub_value in value.items()
+                    )
                 else:
-                    engagement_writer.writerow([key.replace('_', ' ').title(), value])
+                    engagement_rows.append((key.replace('_', ' ').title(), value))
+            writer.writerows(engagement_rows)
             output.write("\n")
-            
+
             # Actions by Type
             if 'actions_by_type' in engagement_data:
                 output.write("ACTIONS BY TYPE\n")
-                action_writer = csv.writer(output)
-                action_writer.writerow(['Action Type', 'Count'])
-                for action_type, count in engagement_data['actions_by_type'].items():
-                    action_writer.writerow([action_type, count])
+                writer.writerow(['Action Type', 'Count'])
+                writer.writerows(engagement_data['actions_by_type'].items())
                 output.write("\n")
-            
+
             # Actions by Subreddit
             if 'actions_by_subreddit' in engagement_data:
                 output.write("ACTIONS BY SUBREDDIT\n")
-                subreddit_writer = csv.writer(output)
-                subreddit_writer.writerow(['Subreddit', 'Count'])
-                for subreddit, count in engagement_data['actions_by_subreddit'].items():
-                    subreddit_writer.writerow([subreddit, count])
+                writer.writerow(['Subreddit', 'Count'])
+                writer.writerows(engagement_data['actions_by_subreddit'].items())
                 output.write("\n")
-            
+
             # Performance Analytics
             output.write("PERFORMANCE ANALYTICS\n")
-            performance_writer = csv.writer(output)
-            performance_writer.writerow(['Metric', 'Value'])
+            writer.writerow(['Metric', 'Value'])
             performance_data = data['performance_analytics']
-            for key, value in performance_data.items():
-                if isinstance(value, list):
-                    performance_writer.writerow([key.replace('_', ' ').title(), ', '.join(map(str, value))])
-                else:
-                    performance_writer.writerow([key.replace('_', ' ').title(), value])
-            
-            csv_content = output.getvalue()
+            writer.writerows(
+                (key.replace('_', ' ').title(),
+                 ', '.join(map(str, value)) if isinstance(value, list) else value)
+                for key, value in performance_data.items()
+            )
+
+            # Encode once; the byte string serves as both payload and size
+            csv_bytes = output.getvalue().encode('utf-8')
             output.close()
-            
+
             filename = f"reddit_analytics_{username}_{days}days_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
-            
+
             return {
                 'format': 'csv',
                 'filename': filename,
-                'content': csv_content,
+                'content': csv_bytes,
                 'content_type': 'text/csv',
-                'size': len(csv_content.encode('utf-8'))
+                'size': len(csv_bytes)
             }
             
         except Exception as e:
@@ -196,97 +332,118 @@ class ExportService:
     def _export_pdf(self, data: Dict[str, Any], username: str, days: int) -> Dict[str, Any]:
         """Export data as PDF report"""
         try:
-            # For PDF generation, we'll create a simple text-based report
-            # In a production environment, you'd use libraries like reportlab or weasyprint
-            
-            report_content = self._generate_text_report(data)
-            filename = f"reddit_analytics_{username}_{days}days_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.txt"
-            
+            report_text = self._generate_text_report(data)
+            ts = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+
+            if Canvas is None:
+                # reportlab not installed; fall back to the text report
+                report_bytes = report_text.encode('utf-8')
+                return {
+                    'format': 'pdf',  # Note: This is actually text format for demo
+                    'filename': f"reddit_analytics_{username}_{days}days_{ts}.txt",
+                    'content': report_bytes,
+                    'content_type': 'text/plain',
+                    'size': len(report_bytes),
+                    'note': 'PDF generation requires additional libraries. This is a text report.'
+                }
+
+            # Low-level canvas with pre-positioned drawString calls: no
+            # flow layout engine, no per-paragraph font metrics
+            buf = BytesIO()
+            canvas = Canvas(buf, pagesize=letter)
+            canvas.setFont('Courier', 10)
+            y = 750
+            for line in report_text.splitlines():
+                if y < 72:
+                    canvas.showPage()
+                    canvas.setFont('Courier', 10)
+                    y = 750
+                canvas.drawString(72, y, line)
+                y -= 14
+            canvas.save()
+
+            pdf_bytes = buf.getvalue()
             return {
-                'format': 'pdf',  # Note: This is actually text format for demo
-                'filename': filename,
-                'content': report_content,
-                'content_type': 'text/plain',
-                'size': len(report_content.encode('utf-8')),
-                'note': 'PDF generation requires additional libraries. This is a text report.'
+                'format': 'pdf',
+                'filename': f"reddit_analytics_{username}_{days}days_{ts}.pdf",
+                'content': pdf_bytes,
+                'content_type': 'application/pdf',
+                'size': len(pdf_bytes)
             }
-            
+
         except Exception as e:
             logger.error(f"Error exporting PDF: {e}")
             raise
     
     def _generate_text_report(self, data: Dict[str, Any]) -> str:
         """Generate a formatted text report"""
-        report = []
-        
-        # Header
-        report.append("=" * 60)
-        report.append("REDDIT AUTOMATION ANALYTICS REPORT")
-        report.append("=" * 60)
-        report.append("")
-        
-        # Export Info
+        # One f-string block per section instead of ~30 append calls;
+        # sub-dicts are bound to locals once
         export_info = data['export_info']
-        report.append(f"Account: {export_info['username']}")
-        report.append(f"Account ID: {export_info['account_id']}")
-        report.append(f"Analysis Period: {export_info['period_days']} days")
-        report.append(f"Export Date: {export_info['export_date']}")
-        report.append("")
-        
-        # Karma Analytics
-        report.append("KARMA ANALYTICS")
-        report.append("-" * 20)
         karma_data = data['karma_analytics']
-        report.append(f"Total Karma: {karma_data['total_karma']:,}")
-        report.append(f"Post Karma: {karma_data['post_karma']:,}")
-        report.append(f"Comment Karma: {karma_data['comment_karma']:,}")
-        report.append(f"Daily Growth Rate: {karma_data['growth_rate_daily']:.2f}")
-        report.append(f"Weekly Growth Rate: {karma_data['growth_rate_weekly']:.2f}")
-        report.append(f"Monthly Growth Rate: {karma_data['growth_rate_monthly']:.2f}")
-        report.append(f"Trend Direction: {karma_data['trend_direction']}")
-        if karma_data['peak_growth_day']:
-            report.append(f"Peak Growth Day: {karma_data['peak_growth_day']}")
-        report.append("")
-        
-        # Engagement Analytics
-        report.append("ENGAGEMENT ANALYTICS")
-        report.append("-" * 20)
         engagement_data = data['engagement_analytics']
-        report.append(f"Total Actions: {engagement_data['total_actions']:,}")
-        report.append(f"Successful Actions: {engagement_data['successful_actions']:,}")
-        report.append(f"Failed Actions: {engagement_data['failed_actions']:,}")
-        report.append(f"Success Rate: {engagement_data['success_rate']:.1%}")
-        report.append(f"Daily Average: {engagement_data['daily_average']:.1f}")
-        report.append("")
-        
-        # Actions by Type
-        if engagement_data['actions_by_type']:
-            report.append("Actions by Type:")
-            for action_type, count in engagement_data['actions_by_type'].items():
-                report.append(f"  {action_type}: {count:,}")
-            report.append("")
-        
-        # Performance Analytics
-        report.append("PERFORMANCE ANALYTICS")
-        report.append("-" * 20)
         performance_data = data['performance_analytics']
-        report.append(f"Automation Efficiency: {performance_data['automation_efficiency']:.1%}")
-        report.append(f"Error Rate: {performance_data['error_rate']:.1%}")
-        report.append(f"Uptime Percentage: {performance_data['uptime_percentage']:.1%}")
-        
+        bar = "=" * 60
+        rule = "-" * 20
+
+        header = f"{bar}\nREDDIT AUTOMATION ANALYTICS REPORT\n{bar}\n"
+
+        info = (
+            f"Account: {export_info['username']}\n"
+            f"Account ID: {export_info['account_id']}\n"
+            f"Analysis Period: {export_info['period_days']} days\n"
+            f"Export Date: {export_info['export_date']}\n"
+        )
+
+        karma = (
+            f"KARMA ANALYTICS\n{rule}\n"
+            f"Total Karma: {karma_data['total_karma']:,}\n"
+            f"Post Karma: {karma_data['post_karma']:,}\n"
+            f"Comment Karma: {karma_data['comment_karma']:,}\n"
+            f"Daily Growth Rate: {karma_data['growth_rate_daily']:.2f}\n"
+            f"Weekly Growth Rate: {karma_data['growth_rate_weekly']:.2f}\n"
+            f"Monthly Growth Rate: {karma_data['growth_rate_monthly']:.2f}\n"
+            f"Trend Direction: {karma_data['trend_direction']}"
+        )
+        if karma_data['peak_growth_day']:
+            karma += f"\nPeak Growth Day: {karma_data['peak_growth_day']}"
+        karma += "\n"
+
+        engagement = (
+            f"ENGAGEMENT ANALYTICS\n{rule}\n"
+            f"Total Actions: {engagement_data['total_actions']:,}\n"
+            f"Successful Actions: {engagement_data['successful_actions']:,}\n"
+            f"Failed Actions: {engagement_data['failed_actions']:,}\n"
+            f"Success Rate: {engagement_data['success_rate']:.1%}\n"
+            f"Daily Average: {engagement_data['daily_average']:.1f}\n"
+        )
+
+        sections = [header, info, karma, engagement]
+
+        if engagement_data['actions_by_type']:
+            sections.append("Actions by Type:\n" + "\n".join(
+                f"  {action_type}: {count:,}"
+                for action_type, count in engagement_data['actions_by_type'].items()
+            ) + "\n")
+
+        performance = (
+            f"PERFORMANCE ANALYTICS\n{rule}\n"
+            f"Automation Efficiency: {performance_data['automation_efficiency']:.1%}\n"
+            f"Error Rate: {performance_data['error_rate']:.1%}\n"
+            f"Uptime Percentage: {performance_data['uptime_percentage']:.1%}"
+        )
         if performance_data['most_active_hours']:
-            report.append(f"Most Active Hours: {', '.join(map(str, performance_data['most_active_hours']))}")
-        
+            performance += f"\nMost Active Hours: {', '.join(map(str, performance_data['most_active_hours']))}"
         if performance_data['best_performing_subreddits']:
-            report.append("Best Performing Subreddits:")
-            for subreddit in performance_data['best_performing_subreddits'][:5]:
-                report.append(f"  {subreddit}")
-        
-        report.append("")
-        report.append("=" * 60)
-        report.append("End of Report")
-        
-        return "\n".join(report)
+            performance += "\nBest Performing Subreddits:\n" + "\n".join(
+                f"  {subreddit}"
+                for subreddit in performance_data['best_performing_subreddits'][:5]
+            )
+        sections.append(performance)
+
+        sections.append(f"\n{bar}\nEnd of Report")
+
+        return "\n".join(sections)
     
     def export_comparative_analytics(self, account_ids: List[int], format: str = 'json', days: int = 30) -> Dict[str, Any]:
         """Export comparative analytics for multiple accounts"""
@@ -308,15 +465,15 @@ class ExportService:
             }
             
             if format == 'json':
-                json_content = json.dumps(export_data, indent=2, default=str)
+                json_bytes = self._encode_json(export_data)
                 filename = f"reddit_comparative_analytics_{len(account_ids)}accounts_{days}days_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
-                
+
                 return {
                     'format': 'json',
                     'filename': filename,
-                    'content': json_content,
+                    'content': json_bytes,
                     'content_type': 'application/json',
-                    'size': len(json_content.encode('utf-8'))
+                    'size': len(json_bytes)
                 }
             
             # For CSV and PDF, implement similar logic as above
@@ -333,34 +490,50 @@ class ExportService:
             from datetime import timedelta
             from models import EngagementLog
 
-            db = SessionLocal()
-            account = db.query(RedditAccount).filter(RedditAccount.id == account_id).first()
-            if not account:
-                raise ValueError(f"Account {account_id} not found")
-
-            # Get engagement logs
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            logs = db.query(EngagementLog).filter(
-                EngagementLog.account_id == account_id,
-                EngagementLog.timestamp >= cutoff_date
-            ).order_by(EngagementLog.timestamp.desc()).all()
-
-            db.close()
-
-            if format == 'csv':
-                return self._export_engagement_logs_csv(logs, account.reddit_username, days)
-            elif format == 'json':
-                return self._export_engagement_logs_json(logs, account.reddit_username, days)
-            else:
-                raise ValueError(f"Unsupported format for engagement logs: {format}")
+            # Stream column tuples straight from the cursor: no ORM
+            # hydration, and peak memory is one yield_per batch instead
+            # of the whole window. The session stays open while the
+            # format helpers consume the iterator.
+            with read_only_session() as db:
+                username = self._account_username(db, account_id)
+                if username is None:
+                    raise ValueError(f"Account {account_id} not found")
+
+                cutoff_date = datetime.utcnow() - timedelta(days=days)
+                logs = db.query(
+                    EngagementLog.id,
+                    EngagementLog.timestamp,
+                    EngagementLog.action_type,
+                    EngagementLog.target_id,
+                    EngagementLog.subreddit,
+                    EngagementLog.status,
+                    EngagementLog.details
+                ).filter(
+                    EngagementLog.account_id == account_id,
+                    EngagementLog.timestamp >= cutoff_date
+                ).order_by(EngagementLog.timestamp.desc()).yield_per(1000)
+
+                if format == 'csv':
+                    return self._export_engagement_logs_csv(logs, username, days)
+                elif format == 'json':
+                    return self._export_engagement_logs_json(logs, username, days)
+                else:
+                    raise ValueError(f"Unsupported format for engagement logs: {format}")
 
         except Exception as e:
             logger.error(f"Error exporting engagement logs: {e}")
             raise
 
-    def _export_engagement_logs_csv(self, logs: List, username: str, days: int) -> Dict[str, Any]:
+    @staticmethod
+    def _engagement_log_extras(details: Optional[Dict[str, Any]]) -> tuple:
+        """Content/score/response time live in the details JSON"""
+        details = details or {}
+        content = details.get('comment_text') or details.get('title')
+        return content, details.get('score'), details.get('response_time')
+
+    def _export_engagement_logs_csv(self, logs, username: str, days: int) -> Dict[str, Any]:
         """Export engagement logs as CSV"""
-        output = StringIO()
+        output = StringIO(newline='')
         writer = csv.writer(output)
 
         # Write header
@@ -369,20 +542,24 @@ class ExportService:
             'Status', 'Content', 'Score', 'Response Time'
         ])
 
-        # Write data
-        for log in logs:
-            writer.writerow([
-                log.timestamp.isoformat(),
-                log.action_type,
-                log.target_id,
-                log.subreddit,
-                log.status,
-                (log.content[:100] + '...') if log.content and len(log.content) > 100 else log.content,
-                log.score,
-                log.response_time
-            ])
-
-        csv_content = output.getvalue()
+        # Write data batch-wise from the streaming query
+        def rows():
+            for log in logs:
+                content, score, response_time = self._engagement_log_extras(log.details)
+                yield (
+                    log.timestamp.isoformat(),
+                    log.action_type,
+                    log.target_id,
+                    log.subreddit,
+                    log.status,
+                    (content[:100] + '...') if content and len(content) > 100 else content,
+                    score,
+                    response_time
+                )
+
+        writer.writerows(rows())
+
+        csv_bytes = output.getvalue().encode('utf-8')
         output.close()
 
         filename = f"engagement_logs_{username}_{days}days_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -390,15 +567,16 @@ class ExportService:
         return {
             'format': 'csv',
             'filename': filename,
-            'content': csv_content,
+            'content': csv_bytes,
             'content_type': 'text/csv',
-            'size': len(csv_content.encode('utf-8'))
+            'size': len(csv_bytes)
         }
 
-    def _export_engagement_logs_json(self, logs: List, username: str, days: int) -> Dict[str, Any]:
+    def _export_engagement_logs_json(self, logs, username: str, days: int) -> Dict[str, Any]:
         """Export engagement logs as JSON"""
         logs_data = []
         for log in logs:
+            content, score, response_time = self._engagement_log_extras(log.details)
             logs_data.append({
                 'id': log.id,
                 'timestamp': log.timestamp.isoformat(),
@@ -406,30 +584,27 @@ class ExportService:
                 'target_id': log.target_id,
                 'subreddit': log.subreddit,
                 'status': log.status,
-                'content': log.content,
-                'score': log.score,
-                'response_time': log.response_time
+                'content': content,
+                'score': score,
+                'response_time': response_time
             })
 
-        export_data = {
-            'export_info': {
-                'username': username,
-                'export_date': datetime.utcnow().isoformat(),
-                'period_days': days,
-                'total_logs': len(logs_data)
-            },
-            'engagement_logs': logs_data
+        export_info = {
+            'username': username,
+            'export_date': datetime.utcnow().isoformat(),
+            'period_days': days,
+            'total_logs': len(logs_data)
         }
 
-        json_content = json.dumps(export_data, indent=2, default=str)
+        json_bytes = self._encode_json_rows(export_info, 'engagement_logs', logs_data)
         filename = f"engagement_logs_{username}_{days}days_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
 
         return {
             'format': 'json',
             'filename': filename,
-            'content': json_content,
+            'content': json_bytes,
             'content_type': 'application/json',
-            'size': len(json_content.encode('utf-8'))
+            'size': len(json_bytes)
         }
 
     def export_karma_history(self, account_id: int, format: str = 'csv', days: int = 30) -> Dict[str, Any]:
@@ -438,34 +613,43 @@ class ExportService:
             from datetime import timedelta
             from models import KarmaLog
 
-            db = SessionLocal()
-            account = db.query(RedditAccount).filter(RedditAccount.id == account_id).first()
-            if not account:
-                raise ValueError(f"Account {account_id} not found")
-
-            # Get karma logs
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            logs = db.query(KarmaLog).filter(
-                KarmaLog.account_id == account_id,
-                KarmaLog.timestamp >= cutoff_date
-            ).order_by(KarmaLog.timestamp.desc()).all()
-
-            db.close()
-
-            if format == 'csv':
-                return self._export_karma_history_csv(logs, account.reddit_username, days)
-            elif format == 'json':
-                return self._export_karma_history_json(logs, account.reddit_username, days)
-            else:
-                raise ValueError(f"Unsupported format for karma history: {format}")
+            # Stream column tuples oldest-first: the helpers used to
+            # materialize the whole window just to iterate reversed(),
+            # so ordering ascending in SQL gives the same output while
+            # keeping memory at one yield_per batch
+            with read_only_session() as db:
+                username = self._account_username(db, account_id)
+                if username is None:
+                    raise ValueError(f"Account {account_id} not found")
+
+                cutoff_date = datetime.utcnow() - timedelta(days=days)
+                logs = db.query(
+                    KarmaLog.id,
+                    KarmaLog.timestamp,
+                    KarmaLog.total_karma,
+                    KarmaLog.post_karma,
+                    KarmaLog.comment_karma,
+                    KarmaLog.by_subreddit,
+                    KarmaLog.by_content_type
+                ).filter(
+                    KarmaLog.account_id == account_id,
+                    KarmaLog.timestamp >= cutoff_date
+                ).order_by(KarmaLog.timestamp.asc()).yield_per(1000)
+
+                if format == 'csv':
+                    return self._export_karma_history_csv(logs, username, days)
+                elif format == 'json':
+                    return self._export_karma_history_json(logs, username, days)
+                else:
+                    raise ValueError(f"Unsupported format for karma history: {format}")
 
         except Exception as e:
             logger.error(f"Error exporting karma history: {e}")
             raise
 
-    def _export_karma_history_csv(self, logs: List, username: str, days: int) -> Dict[str, Any]:
+    def _export_karma_history_csv(self, logs, username: str, days: int) -> Dict[str, Any]:
         """Export karma history as CSV"""
-        output = StringIO()
+        output = StringIO(newline='')
         writer = csv.writer(output)
 
         # Write header
@@ -474,23 +658,26 @@ class ExportService:
             'Karma Change', 'By Subreddit', 'By Content Type'
         ])
 
-        # Calculate karma changes
-        prev_total = 0
-        for i, log in enumerate(reversed(logs)):
-            karma_change = log.total_karma - prev_total if i > 0 else 0
-            prev_total = log.total_karma
-
-            writer.writerow([
-                log.timestamp.isoformat(),
-                log.total_karma,
-                log.post_karma,
-                log.comment_karma,
-                karma_change,
-                json.dumps(log.by_subreddit) if log.by_subreddit else '',
-                json.dumps(log.by_content_type) if log.by_content_type else ''
-            ])
-
-        csv_content = output.getvalue()
+        # Calculate karma changes while streaming oldest-first
+        def rows():
+            prev_total = 0
+            for i, log in enumerate(logs):
+                karma_change = log.total_karma - prev_total if i > 0 else 0
+                prev_total = log.total_karma
+
+                yield (
+                    log.timestamp.isoformat(),
+                    log.total_karma,
+                    log.post_karma,
+                    log.comment_karma,
+                    karma_change,
+                    _dumps_compact(log.by_subreddit) if log.by_subreddit else '',
+                    _dumps_compact(log.by_content_type) if log.by_content_type else ''
+                )
+
+        writer.writerows(rows())
+
+        csv_bytes = output.getvalue().encode('utf-8')
         output.close()
 
         filename = f"karma_history_{username}_{days}days_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -498,17 +685,17 @@ class ExportService:
         return {
             'format': 'csv',
             'filename': filename,
-            'content': csv_content,
+            'content': csv_bytes,
             'content_type': 'text/csv',
-            'size': len(csv_content.encode('utf-8'))
+            'size': len(csv_bytes)
         }
 
-    def _export_karma_history_json(self, logs: List, username: str, days: int) -> Dict[str, Any]:
+    def _export_karma_history_json(self, logs, username: str, days: int) -> Dict[str, Any]:
         """Export karma history as JSON"""
         logs_data = []
         prev_total = 0
 
-        for i, log in enumerate(reversed(logs)):
+        for i, log in enumerate(logs):
             karma_change = log.total_karma - prev_total if i > 0 else 0
             prev_total = log.total_karma
 
@@ -523,25 +710,22 @@ class ExportService:
                 'by_content_type': log.by_content_type
             })
 
-        export_data = {
-            'export_info': {
-                'username': username,
-                'export_date': datetime.utcnow().isoformat(),
-                'period_days': days,
-                'total_logs': len(logs_data)
-            },
-            'karma_history': logs_data
+        export_info = {
+            'username': username,
+            'export_date': datetime.utcnow().isoformat(),
+            'period_days': days,
+            'total_logs': len(logs_data)
         }
 
-        json_content = json.dumps(export_data, indent=2, default=str)
+        json_bytes = self._encode_json_rows(export_info, 'karma_history', logs_data)
         filename = f"karma_history_{username}_{days}days_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
 
         return {
             'format': 'json',
             'filename': filename,
-            'content': json_content,
+            'content': json_bytes,
             'content_type': 'application/json',
-            'size': len(json_content.encode('utf-8'))
+            'size': len(json_bytes)
         }
 
 export_service = ExportService()
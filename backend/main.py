@@ -6,7 +6,14 @@ import os
 
 from routers import accounts, automation, analytics, admin, nlp, safety, export, targeting, behavior, health, reddit_actions, discord_promotion, anti_detection
 from database import create_tables
-from error_handler import global_exception_handler
+from error_handler import (
+    global_exception_handler, validation_error_handler,
+    rate_limit_error_handler, authentication_error_handler,
+    reddit_api_error_handler, database_error_handler,
+    ValidationError, RateLimitError, AuthenticationError
+)
+from sqlalchemy.exc import SQLAlchemyError
+import praw.exceptions
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,7 +25,13 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Add global exception handler
+# Per-type exception handlers: FastAPI's type-keyed registry dispatches
+# in O(1); the global handler stays as the catch-all fallback
+app.add_exception_handler(ValidationError, validation_error_handler)
+app.add_exception_handler(RateLimitError, rate_limit_error_handler)
+app.add_exception_handler(AuthenticationError, authentication_error_handler)
+app.add_exception_handler(praw.exceptions.RedditAPIException, reddit_api_error_handler)
+app.add_exception_handler(SQLAlchemyError, database_error_handler)
 app.add_exception_handler(Exception, global_exception_handler)
 
 app.add_middleware(
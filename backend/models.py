@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, JSON, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, JSON, Float, Index
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 
@@ -63,6 +63,10 @@ class EngagementLog(Base):
     status = Column(String)  # success, failed, removed
     details = Column(JSON)
     account = relationship('RedditAccount', back_populates='engagement_logs')
+    # Composite index for the per-account time-window queries
+    __table_args__ = (
+        Index('ix_engagement_account_ts', 'account_id', 'timestamp'),
+    )
 
 class ActivityLog(Base):
     __tablename__ = 'activity_logs'
@@ -70,8 +74,18 @@ class ActivityLog(Base):
     account_id = Column(Integer, ForeignKey('reddit_accounts.id'))
     timestamp = Column(DateTime, default=datetime.utcnow)
     action = Column(String)
+    # Promoted out of the details JSON so error aggregation can group
+    # and index on real columns
+    action_type = Column(String, nullable=True)
+    error_type = Column(String, nullable=True)
     details = Column(JSON)
     account = relationship('RedditAccount', back_populates='activity_logs')
+    # Composite indexes for action-filtered time-range scans (error log
+    # analysis and nightly cleanup)
+    __table_args__ = (
+        Index('ix_activity_action_ts', 'action', 'timestamp'),
+        Index('ix_activity_action_error_ts', 'action', 'error_type', 'timestamp'),
+    )
 
 class SubredditPerformance(Base):
     __tablename__ = 'subreddit_performance'
@@ -174,6 +188,14 @@ class CampaignPost(Base):
     details = Column(JSON)
     campaign = relationship('PromotionCampaign', back_populates='campaign_posts')
     account = relationship('RedditAccount')
+    # Composite indexes for the hot monitoring/health-check filters
+    __table_args__ = (
+        Index('ix_campaignpost_campaign_status_posted', 'campaign_id', 'status', 'posted_at'),
+        Index('ix_campaignpost_account_posted', 'account_id', 'posted_at'),
+        Index('ix_campaignpost_account_status', 'account_id', 'status'),
+        Index('ix_campaignpost_campaign_posted', 'campaign_id', 'posted_at'),
+        Index('ix_campaignpost_campaign_subreddit_posted', 'campaign_id', 'subreddit', 'posted_at'),
+    )
 
 class SubredditTarget(Base):
     __tablename__ = 'subreddit_targets'
@@ -1,5 +1,7 @@
 import praw
 import os
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from typing import Optional, Dict, Any, List
 import logging
@@ -8,6 +10,19 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+def _build_pooled_session() -> requests.Session:
+    """Build a keep-alive session with a wide connection pool.
+
+    PRAW's default session keeps one connection per host; bulk operations
+    like batched info() fetches and fan-out health checks benefit from a
+    larger pool that amortizes TLS handshakes across requests.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 class RedditService:
     def __init__(self):
         self.client_id = os.getenv("REDDIT_CLIENT_ID")
@@ -64,7 +79,8 @@ class RedditService:
             client_id=self.client_id,
             client_secret=self.client_secret,
             refresh_token=refresh_token,
-            user_agent=self.user_agent
+            user_agent=self.user_agent,
+            requestor_kwargs={'session': _build_pooled_session()}
         )
     
     def get_user_karma(self, refresh_token: str) -> Dict[str, int]:
@@ -8,6 +8,7 @@ import logging
 from database import get_db
 from models import RedditAccount, AutomationSettings, ActivityLog
 from engagement_service import engagement_service
+from safety_tasks import notify_automation_scheduled
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -112,6 +113,11 @@ def update_automation_settings(
         db.add(activity_log)
         db.commit()
 
+        # Wake the automation processor if anything was switched on
+        if any(update_data.get(field) for field in
+               ('auto_upvote_enabled', 'auto_comment_enabled', 'auto_post_enabled')):
+            notify_automation_scheduled(account_id)
+
         return {
             "message": "Automation settings updated successfully",
             "account_id": account_id,
@@ -364,6 +370,10 @@ def toggle_automation(
         db.add(activity_log)
         db.commit()
 
+        # Wake the automation processor if automation was switched on
+        if enabled:
+            notify_automation_scheduled(account_id)
+
         return {
             "message": f"Automation {automation_type} {'enabled' if enabled else 'disabled'}",
             "account_id": account_id,
@@ -12,8 +12,8 @@ import logging
 from database import get_db
 from models import RedditAccount, AutomationSettings
 from behavior_simulation import (
-    behavior_simulator, ActivityType, UserPersonality, 
-    ActivitySession, BehaviorPattern
+    behavior_simulator, ActivityType, UserPersonality,
+    ActivitySession, BehaviorPattern, DISTRIBUTION_ORDER
 )
 
 router = APIRouter()
@@ -144,7 +144,7 @@ async def get_account_behavior_pattern(
             daily_sessions=pattern.daily_sessions,
             session_duration_range=[pattern.session_duration_range[0], pattern.session_duration_range[1]],
             preferred_hours=pattern.preferred_hours,
-            activity_distribution={k.value: v for k, v in pattern.activity_distribution.items()},
+            activity_distribution={k.value: v for k, v in zip(DISTRIBUTION_ORDER, pattern.activity_distribution)},
             break_frequency=pattern.break_frequency,
             weekend_modifier=pattern.weekend_modifier
         )
@@ -20,6 +20,15 @@ from reddit_service import reddit_service
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+def _invalidate_cached_targets(campaign_id: int):
+    """Drop the task module's cached target list after an operator edit"""
+    # Celery task module is an optional import, same as in the endpoints
+    try:
+        from discord_promotion_tasks import _invalidate_targets_cache
+        _invalidate_targets_cache(campaign_id)
+    except ImportError:
+        pass
+
 # Pydantic models for API requests
 class CreateCampaignRequest(BaseModel):
     name: str
@@ -612,6 +621,7 @@ async def add_campaign_subreddit(
 
         db.add(target)
         db.commit()
+        _invalidate_cached_targets(campaign_id)
 
         logger.info(f"Added subreddit r/{subreddit_name} to campaign {campaign_id}")
 
@@ -676,6 +686,7 @@ async def update_campaign_subreddit(
             target.notes = notes
 
         db.commit()
+        _invalidate_cached_targets(campaign_id)
 
         logger.info(f"Updated subreddit target {target_id} for campaign {campaign_id}")
 
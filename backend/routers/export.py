@@ -18,6 +18,10 @@ from analytics_engine import analytics_engine
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+def _content_bytes(content) -> bytes:
+    """Export helpers return bytes; tolerate str for older formats"""
+    return content.encode('utf-8') if isinstance(content, str) else content
+
 # Pydantic models for API requests/responses
 class ExportRequest(BaseModel):
     account_ids: List[int]
@@ -395,22 +399,22 @@ async def export_complete_account_data(
                 # Export analytics
                 analytics_result = export_service.export_account_analytics(account_id, format, days)
                 analytics_path = os.path.join(temp_dir, analytics_result['filename'])
-                with open(analytics_path, 'w', encoding='utf-8') as f:
-                    f.write(analytics_result['content'])
+                with open(analytics_path, 'wb') as f:
+                    f.write(_content_bytes(analytics_result['content']))
                 files_created.append((analytics_path, analytics_result['filename']))
                 
                 # Export engagement logs
                 engagement_result = export_service.export_engagement_logs(account_id, format, days)
                 engagement_path = os.path.join(temp_dir, engagement_result['filename'])
-                with open(engagement_path, 'w', encoding='utf-8') as f:
-                    f.write(engagement_result['content'])
+                with open(engagement_path, 'wb') as f:
+                    f.write(_content_bytes(engagement_result['content']))
                 files_created.append((engagement_path, engagement_result['filename']))
                 
                 # Export karma history
                 karma_result = export_service.export_karma_history(account_id, format, days)
                 karma_path = os.path.join(temp_dir, karma_result['filename'])
-                with open(karma_path, 'w', encoding='utf-8') as f:
-                    f.write(karma_result['content'])
+                with open(karma_path, 'wb') as f:
+                    f.write(_content_bytes(karma_result['content']))
                 files_created.append((karma_path, karma_result['filename']))
                 
             except Exception as e:
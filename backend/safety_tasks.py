@@ -578,6 +578,46 @@ def reset_daily_limits() -> Dict[str, Any]:
         logger.error(f"Error resetting daily limits: {e}")
         return {'success': False, 'error': str(e)}
 
+# Wake list for push-triggered automation processing: schedulers LPUSH here
+# so a watcher can react immediately instead of waiting for the next poll
+AUTOMATION_WAKE_LIST = 'automation:wake'
+
+def notify_automation_scheduled(account_id: int = 0):
+    """Signal that automation was (re)enabled so processing starts now.
+
+    Falls back silently if Redis is unavailable - the periodic poll still
+    picks the work up on its next tick.
+    """
+    try:
+        redis_client.lpush(AUTOMATION_WAKE_LIST, account_id)
+    except Exception as e:
+        logger.warning(f"Could not publish automation wakeup: {e}")
+
+@celery_app.task
+def watch_automation_wakeups(block_seconds: int = 50) -> Dict[str, Any]:
+    """Block on the wake list and process automation as soon as it is signalled.
+
+    Replaces most of the every-minute polling: the beat entry fires this
+    watcher, which BLPOPs with a long timeout so accounts enabled mid-tick
+    are processed immediately. The plain poll remains as a safety net on a
+    much longer interval.
+    """
+    try:
+        wakeup = redis_client.blpop(AUTOMATION_WAKE_LIST, timeout=block_seconds)
+        if wakeup is None:
+            return {'success': True, 'woken': False}
+
+        # Drain any queued wakeups - one processing run covers them all
+        while redis_client.lpop(AUTOMATION_WAKE_LIST):
+            pass
+
+        result = process_scheduled_automation.apply()
+        return {'success': True, 'woken': True, 'result': result.get()}
+
+    except Exception as e:
+        logger.error(f"Error watching automation wakeups: {e}")
+        return {'success': False, 'error': str(e)}
+
 @celery_app.task(bind=True, max_retries=3)
 def process_scheduled_automation(self) -> Dict[str, Any]:
     """Process scheduled automation tasks based on account settings"""